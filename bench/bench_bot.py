@@ -0,0 +1,226 @@
+"""
+Load-test the bot's handlers offline against the stub upstreams in stubs.py.
+
+The eBay, OpenSky and OpenWeather clients are pointed at a local stub server
+that replays bench/fixtures, and the Discord side is replaced by the fakes in
+fakes.py, so everything runs without network access or a bot token. Each
+scenario is run ``--iterations`` times with ``--concurrency`` callers at once,
+then again under tracemalloc for its peak memory.
+
+    python bench/bench_bot.py [--scenario fr_cold] [--iterations 200] [--concurrency 10]
+                              [--latency 0.05] [--jitter 0.02] [--error-rate 0.01] [--discord-limits]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "src"))
+sys.path.insert(0, str(BENCH_DIR))
+
+from fakes import FakeChannel, FakeInteraction, FakeMessage, FakeUser  # noqa: E402
+from stubs import StubServers  # noqa: E402
+
+PLAIN_MESSAGES = ["lol", "anyone up for food later?", "that's what I said yesterday", "ok", "😂😂😂",
+                  "did you see the match", "brb", "no chance mate", "what time are we meeting"]
+LINK_MESSAGES = ["look at this https://x.com/someone/status/1790000000000000000?s=20&t=abc",
+                 "https://www.instagram.com/reel/C6abcdEFgh/?igsh=MWQ1ZGUxMzBkMA==",
+                 "https://www.reddit.com/r/unitedkingdom/comments/1c2d3e4/title/?share_id=abc&utm_source=share",
+                 "docs are at https://docs.python.org/3/library/asyncio.html"]
+
+
+def isolate(tmp: Path, stubs: StubServers) -> None:
+    """Point everything the bot writes or calls at the temp dir and the stubs, before it's imported."""
+    os.environ.update(stubs.env())
+    os.environ.update({
+        "LOG_FILE": str(tmp / "logs.log"),
+        "INVENTORY_FILE": str(tmp / "inventory.sqlite3"),
+        "EBAY_SEEN_DB_FILE": str(tmp / "ebay_seen.sqlite3"),
+        "EBAY_SEARCHES_FILE": str(tmp / "ebay_searches.json"),
+        "AIRCRAFT_DB_FILE": str(tmp / "aircraft.idx"),
+        "EBAY_PERSIST_TOKEN": "0",
+        "EBAY_CLIENT_ID": "bench",
+        "EBAY_CLIENT_SECRET": "bench",
+        "OPENWEATHER_API_KEY": "bench",
+        "METRICS_PORT": "0",
+    })
+    os.environ.setdefault("LOG_LEVEL", "INFO")
+
+
+def scenarios(botter, send_delay: float) -> dict[str, Callable[[], Awaitable]]:
+    import eb
+    import planes
+    import weather
+
+    owner = FakeUser(botter.USER_ID_MAX, "owner")
+    channel = FakeChannel(send_delay=send_delay)
+    messages = random.Random(0)
+
+    async def ebay_poll():
+        results = await eb.get_new_listings_for_searches(botter.EBAY_SEARCHES)
+        errors = [result.error for result in results if result.error]
+        if errors:
+            raise errors[0]
+
+    async def fr_cold():
+        planes._cache._entries.clear()
+        await planes.get_nearby_aircraft(botter.HOME_LAT, botter.HOME_LON, radius_km=botter.FR_RADIUS_KM)
+
+    async def fr_cached():
+        await planes.get_nearby_aircraft(botter.HOME_LAT, botter.HOME_LON, radius_km=botter.FR_RADIUS_KM)
+
+    async def weather_cold():
+        weather._cache._entries.clear()
+        if await weather.fetch_weather() is None:
+            raise RuntimeError("no weather embed")
+
+    async def weather_cached():
+        if await weather.fetch_weather() is None:
+            raise RuntimeError("no weather embed")
+
+    async def on_message():
+        # Roughly one message in ten has a link in it
+        pool = LINK_MESSAGES if messages.random() < 0.1 else PLAIN_MESSAGES
+        await botter.on_message(FakeMessage(messages.choice(pool), channel=channel, send_delay=send_delay))
+
+    def command(callback, user: FakeUser | None = None):
+        async def run():
+            interaction = FakeInteraction(user, send_delay)
+            await callback(interaction)
+            if not interaction.replies:
+                raise RuntimeError(f"/{callback.__name__} didn't reply")
+
+        return run
+
+    return {
+        "ebay_poll": ebay_poll,
+        "fr_cold": fr_cold,
+        "fr_cached": fr_cached,
+        "weather_cold": weather_cold,
+        "weather_cached": weather_cached,
+        "on_message": on_message,
+        "cmd_fr": command(botter.fr.callback),
+        "cmd_weather": command(botter.weather.callback),
+        "cmd_ebay": command(botter.ebay.callback),
+        "cmd_stats": command(botter.stats.callback, owner),
+    }
+
+
+async def drive(operation: Callable[[], Awaitable], iterations: int, concurrency: int) -> tuple[list[float], int, float]:
+    """Run ``operation`` ``iterations`` times from ``concurrency`` workers; returns (latencies, errors, wall time)."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(iterations))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await operation()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args: argparse.Namespace) -> list[dict]:
+    stubs = StubServers(args.latency, args.jitter, args.error_rate, seed=args.seed)
+    await stubs.start()
+    tmp = tempfile.TemporaryDirectory(prefix="botter-bench-")
+    isolate(Path(tmp.name), stubs)
+
+    import botter
+    import httpclient
+    from sender import SendScheduler
+
+    # The real bot user is only known after logging in; commands.Bot compares message authors to it
+    botter.bot._connection.user = FakeUser(name="botter", bot=True)
+    if not args.discord_limits:
+        # Measure the handlers rather than Discord's rate limits
+        botter.sender = SendScheduler(per_destination_rate=1e6, per_destination_burst=1e6,
+                                      global_rate=1e6, global_burst=1e6)
+
+    available = scenarios(botter, args.send_delay)
+    names = args.scenario or list(available)
+    results = []
+    try:
+        for name in names:
+            operation = available[name]
+            # Warm up connection pools, the OAuth token and module level state
+            await drive(operation, min(5, args.iterations), 1)
+            latencies, errors, elapsed = await drive(operation, args.iterations, args.concurrency)
+
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            await drive(operation, max(1, args.iterations // 10), args.concurrency)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                "scenario": name,
+                "ops": len(latencies),
+                "ops_per_second": len(latencies) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+                "errors": errors,
+                "peak_kib": peak / 1024,
+            })
+    finally:
+        await httpclient.close_session()
+        await stubs.stop()
+        tmp.cleanup()
+
+    print(f"{'scenario':<16} {'ops':>6} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['scenario']:<16} {r['ops']:>6} {r['ops_per_second']:>9.1f} {r['p50_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['errors']:>6} {r['peak_kib']:>9.0f}")
+    print(f"stub requests: {stubs.requests}, injected errors: {stubs.errors}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenario", action="append",
+                        choices=["ebay_poll", "fr_cold", "fr_cached", "weather_cold", "weather_cached",
+                                 "on_message", "cmd_fr", "cmd_weather", "cmd_ebay", "cmd_stats"],
+                        help="run only this scenario (repeatable); all by default")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stubs take to answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests that fail with 503")
+    parser.add_argument("--send-delay", type=float, default=0.0, help="seconds each fake Discord call takes")
+    parser.add_argument("--discord-limits", action="store_true",
+                        help="keep the send scheduler's real Discord rate limits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
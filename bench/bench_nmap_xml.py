@@ -0,0 +1,63 @@
+"""
+Benchmark the streaming nmap XML parser against the saved fixtures.
+
+The host elements of a fixture are repeated to build a large scan, which is
+fed to the parser in pipe-sized chunks, the way nmap's stdout arrives.
+
+    python bench/bench_nmap_xml.py [--hosts 50000] [--fixture nmap_ports.xml]
+"""
+import argparse
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import nmap  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+CHUNK_SIZE = 64 * 1024
+
+
+def synthetic_scan(fixture: Path, hosts: int) -> bytes:
+    data = fixture.read_bytes()
+    blocks = re.findall(rb"<host[ >].*?</host>\n?", data, re.S)
+    head = data[:data.index(blocks[0])]
+    tail = data[data.rindex(blocks[-1]) + len(blocks[-1]):]
+    body = b"".join(blocks[i % len(blocks)] for i in range(hosts))
+    return head + body + tail
+
+
+def chunks(data: bytes):
+    for i in range(0, len(data), CHUNK_SIZE):
+        yield data[i:i + CHUNK_SIZE]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hosts", type=int, default=50000)
+    parser.add_argument("--fixture", default="nmap_ports.xml")
+    args = parser.parse_args()
+
+    data = synthetic_scan(FIXTURES / args.fixture, args.hosts)
+
+    start = time.perf_counter()
+    parsed = sum(1 for _ in nmap.parse_xml(chunks(data)))
+    elapsed = time.perf_counter() - start
+
+    # Separate pass, since tracing allocations slows parsing down several times
+    tracemalloc.start()
+    sum(1 for _ in nmap.parse_xml(chunks(data)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"fixture:     {args.fixture}")
+    print(f"input:       {len(data) / 1e6:.1f} MB, {parsed} hosts")
+    print(f"time:        {elapsed:.2f}s ({parsed / elapsed:,.0f} hosts/s, {len(data) / 1e6 / elapsed:.1f} MB/s)")
+    print(f"peak memory: {peak / 1e6:.2f} MB (excluding the input buffer)")
+
+
+if __name__ == "__main__":
+    main()
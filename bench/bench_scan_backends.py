@@ -0,0 +1,93 @@
+"""
+Compare the nmap and pure-Python TCP scan backends on localhost.
+
+Discovery sweeps a loopback range, where every address answers, and the port
+scan runs nmap's -F port list against a few loopback addresses. A couple of
+listening sockets are opened first so both backends have open ports to find.
+Backends that aren't available (no nmap binary) are skipped.
+
+    python bench/bench_scan_backends.py [--network 127.0.0.0/24] [--scan-hosts 4] [--rounds 3]
+"""
+import argparse
+import asyncio
+import shutil
+import socket
+import statistics
+import sys
+import time
+from contextlib import aclosing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import scanner  # noqa: E402
+
+# Not among the discovery ports, so the sweep doesn't fill their (never accepted) backlog
+LISTEN_PORTS = [8443, 8888]
+
+
+def open_listeners() -> list[socket.socket]:
+    listeners = []
+    for port in LISTEN_PORTS:
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(("0.0.0.0", port))
+        except OSError:
+            sock.close()
+            continue
+        sock.listen(128)
+        listeners.append(sock)
+    return listeners
+
+
+async def time_discovery(backend, network: str) -> tuple[float, int]:
+    start = time.perf_counter()
+    hosts = await backend.discover_hosts_async([network])
+    return time.perf_counter() - start, len(hosts)
+
+
+async def time_port_scan(backend, hosts: list[str]) -> tuple[float, int]:
+    start = time.perf_counter()
+    open_ports = 0
+    async with aclosing(backend.scan_ports_async(hosts)) as results:
+        async for host in results:
+            open_ports += len(host.open_ports)
+    return time.perf_counter() - start, open_ports
+
+
+async def bench(name: str, network: str, scan_hosts: list[str], rounds: int) -> None:
+    backend = scanner.get_backend(name)
+    discovery, scans = [], []
+    for _ in range(rounds):
+        elapsed, found = await time_discovery(backend, network)
+        discovery.append(elapsed)
+        elapsed, open_ports = await time_port_scan(backend, scan_hosts)
+        scans.append(elapsed)
+    print(f"{name:5}  discovery {statistics.median(discovery):6.2f}s ({found} hosts)   "
+          f"port scan {statistics.median(scans):6.2f}s ({open_ports} open ports on {len(scan_hosts)} hosts)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--network", default="127.0.0.0/24")
+    parser.add_argument("--scan-hosts", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    scan_hosts = [f"127.0.0.{i}" for i in range(1, args.scan_hosts + 1)]
+    backends = ["tcp"] + (["nmap"] if shutil.which("nmap") else [])
+    if "nmap" not in backends:
+        print("nmap not found, only benchmarking the tcp backend")
+
+    listeners = open_listeners()
+    try:
+        for name in backends:
+            asyncio.run(bench(name, args.network, scan_hosts, args.rounds))
+    finally:
+        for sock in listeners:
+            sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Regression checks for the link rewriter in src/linkfix.py.
+
+Links that have nothing to remove or replace must come back byte for byte
+the same, or on_message deletes and reposts the message for nothing.
+
+    python bench/check_linkfix.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from linkfix import LinkRewriter  # noqa: E402
+
+UNCHANGED = [
+    "https://GitHub.com/h0bnobs/botter",
+    "HTTPS://github.com/h0bnobs/botter",
+    "https://example.com/a?#x",
+    "https://example.com/a?q=1&",
+    "https://example.com/a#",
+    "https://example.com/a?q=1&&b=2",
+    "https://WWW.Example.COM:8443/Path?Q=%20x#Frag",
+    "see https://docs.python.org/3/library/asyncio.html.",
+    "https://en.wikipedia.org/wiki/Foo_(bar)",
+    "https://www.youtube.com/watch?v=abc&t=42",
+    "https://pic.x.com/abc",
+]
+
+REWRITTEN = {
+    "https://x.com/someone/status/1?s=20&t=abc": "https://fixupx.com/someone/status/1",
+    "https://www.twitter.com/someone/status/1": "https://fixupx.com/someone/status/1",
+    "http://mobile.twitter.com/someone/status/1": "https://fixupx.com/someone/status/1",
+    "HTTPS://X.COM/someone/status/1": "https://fixupx.com/someone/status/1",
+    "https://pic.twitter.com/abc?s=20": "https://pic.twitter.com/abc",
+    "https://vm.tiktok.com/ZMabc/": "https://vm.tiktok.com/ZMabc/",
+    "https://www.instagram.com/reel/C6abc/?igsh=MWQ1==": "https://kkinstagram.com/reel/C6abc/",
+    "https://example.com/a?utm_source=x&q=1#top": "https://example.com/a?q=1#top",
+    "https://Example.com/A?q=1&fbclid=abc&": "https://Example.com/A?q=1",
+    "https://example.com/a?utm_source=x#top": "https://example.com/a#top",
+    "https://youtu.be/abc?si=xyz&t=10": "https://youtu.be/abc?t=10",
+    "https://example.com/?si=keep": "https://example.com/?si=keep",
+}
+
+
+def main() -> int:
+    rewriter = LinkRewriter()
+    failures = 0
+    for message in UNCHANGED:
+        result = rewriter.rewrite(message)
+        if result is not None:
+            print(f"FAIL {message!r} should be left alone, got {result!r}")
+            failures += 1
+    for message, expected in REWRITTEN.items():
+        result = rewriter.rewrite(message)
+        if (result or message) != expected:
+            print(f"FAIL {message!r} -> {result!r}, expected {expected!r}")
+            failures += 1
+    total = len(UNCHANGED) + len(REWRITTEN)
+    print(f"{total - failures}/{total} link checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Minimal stand-ins for the discord.py objects the bot's handlers touch.
+
+They implement only the attributes and coroutines the handlers in botter.py
+use, and count what was sent, so handlers can be driven without a gateway
+connection.
+"""
+import asyncio
+import itertools
+from datetime import datetime, timezone
+
+_ids = itertools.count(1_000_000_000_000_000)
+
+
+class FakeUser:
+    def __init__(self, user_id: int | None = None, name: str = "bench", bot: bool = False):
+        self.id = next(_ids) if user_id is None else user_id
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeUser) and other.id == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+
+class FakeMessage:
+    def __init__(self, content: str = "", author: FakeUser | None = None, channel: "FakeChannel | None" = None,
+                 send_delay: float = 0.0):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author or FakeUser()
+        self.channel = channel
+        self.guild = None
+        self.attachments = []
+        self.embeds = []
+        self.reactions = []
+        self.deleted = False
+        self._send_delay = send_delay
+        self._state = None
+
+    async def edit(self, content: str | None = None, **kwargs) -> "FakeMessage":
+        await asyncio.sleep(self._send_delay)
+        if content is not None:
+            self.content = content
+        return self
+
+    async def delete(self) -> None:
+        await asyncio.sleep(self._send_delay)
+        self.deleted = True
+
+    async def add_reaction(self, emoji: str) -> None:
+        await asyncio.sleep(self._send_delay)
+        self.reactions.append(emoji)
+
+
+class FakeChannel:
+    """A text channel; ``send_delay`` simulates the round trip to Discord."""
+
+    def __init__(self, channel_id: int | None = None, send_delay: float = 0.0):
+        self.id = next(_ids) if channel_id is None else channel_id
+        self.send_delay = send_delay
+        self.sent: list[dict] = []
+
+    async def send(self, content: str | None = None, **kwargs) -> FakeMessage:
+        await asyncio.sleep(self.send_delay)
+        kwargs["content"] = content
+        self.sent.append(kwargs)
+        return FakeMessage(content or "", channel=self, send_delay=self.send_delay)
+
+
+class FakeWebhook(FakeChannel):
+    """An interaction's followup webhook, which the send scheduler keys by token."""
+
+    def __init__(self, send_delay: float = 0.0):
+        super().__init__(send_delay=send_delay)
+        self.token = f"token-{self.id}"
+
+
+class FakeResponse:
+    def __init__(self, send_delay: float = 0.0):
+        self.send_delay = send_delay
+        self.deferred = False
+        self.sent: list[dict] = []
+
+    def is_done(self) -> bool:
+        return self.deferred or bool(self.sent)
+
+    async def defer(self, **kwargs) -> None:
+        await asyncio.sleep(self.send_delay)
+        self.deferred = True
+
+    async def send_message(self, content: str | None = None, **kwargs) -> None:
+        await asyncio.sleep(self.send_delay)
+        kwargs["content"] = content
+        self.sent.append(kwargs)
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeUser | None = None, send_delay: float = 0.0):
+        self.id = next(_ids)
+        self.user = user or FakeUser()
+        self.created_at = datetime.now(timezone.utc)
+        self.response = FakeResponse(send_delay)
+        self.followup = FakeWebhook(send_delay)
+        self.guild = None
+        self.command = None
+        self.extras = {}
+
+    @property
+    def replies(self) -> int:
+        return len(self.response.sent) + len(self.followup.sent)
@@ -0,0 +1,163 @@
+"""
+Local stand-ins for the eBay, OpenSky and OpenWeather APIs.
+
+One aiohttp server answers the routes the bot calls, from the recorded
+responses in bench/fixtures, with configurable latency, jitter and error
+rate. Point the bot at it with EBAY_API_URL, OPENSKY_API_URL and
+OPENWEATHER_API_URL (see ``StubServers.env``).
+
+    python bench/stubs.py [--port 8765] [--latency 0.05] [--jitter 0.02] [--error-rate 0.01]
+"""
+import argparse
+import asyncio
+import copy
+import json
+import random
+from pathlib import Path
+
+from aiohttp import web
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def load_fixture(name: str) -> dict:
+    with open(FIXTURES / name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubServers:
+    """
+    The fake upstreams, all on one local port.
+
+    eBay searches return ``new_per_poll`` listings that weren't there on the
+    previous poll, followed by ones that were, so the bot's catch-up logic
+    sees the same shape of results as a busy category.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 new_per_poll: int = 5, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.new_per_poll = new_per_poll
+        self.random = random.Random(seed)
+        self.requests: dict[str, int] = {}
+        self.errors = 0
+
+        self.ebay_token = load_fixture("ebay_token.json")
+        self.ebay_search = load_fixture("ebay_search.json")
+        self.opensky = load_fixture("opensky_states.json")
+        self.forecast = load_fixture("openweather_forecast.json")
+        self._ebay_newest = 186_000_000_000
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._simulate])
+        app.router.add_post("/identity/v1/oauth2/token", self.oauth_token)
+        app.router.add_get("/buy/browse/v1/item_summary/search", self.ebay_item_search)
+        app.router.add_get("/api/states/all", self.opensky_states)
+        app.router.add_get("/data/2.5/forecast", self.openweather_forecast)
+        return app
+
+    def env(self) -> dict[str, str]:
+        """Environment variables that point the bot's API clients at these stubs."""
+        return {
+            "EBAY_API_URL": self.url,
+            "OPENSKY_API_URL": f"{self.url}/api",
+            "OPENWEATHER_API_URL": f"{self.url}/data/2.5",
+        }
+
+    @web.middleware
+    async def _simulate(self, request: web.Request, handler):
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return await handler(request)
+
+    async def oauth_token(self, request: web.Request) -> web.Response:
+        if not request.headers.get("Authorization", "").startswith("Basic "):
+            return web.json_response({"error": "invalid_client"}, status=401)
+        return web.json_response(self.ebay_token)
+
+    async def ebay_item_search(self, request: web.Request) -> web.Response:
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return web.json_response({"errors": [{"errorId": 1001}]}, status=401)
+        limit = int(request.query.get("limit", 50))
+        offset = int(request.query.get("offset", 0))
+        if offset == 0:
+            self._ebay_newest += self.new_per_poll
+
+        template = self.ebay_search["itemSummaries"]
+        items = []
+        for i in range(offset, offset + limit):
+            item = copy.copy(template[i % len(template)])
+            legacy_id = str(self._ebay_newest - i)
+            item["itemId"] = f"v1|{legacy_id}|0"
+            item["legacyItemId"] = legacy_id
+            item["itemWebUrl"] = f"https://www.ebay.co.uk/itm/{legacy_id}"
+            items.append(item)
+
+        total = self.ebay_search["total"]
+        data = {key: value for key, value in self.ebay_search.items() if key != "itemSummaries"}
+        data.update(limit=limit, offset=offset, itemSummaries=items)
+        if offset + limit >= total:
+            data.pop("next", None)
+        return web.json_response(data)
+
+    async def opensky_states(self, request: web.Request) -> web.Response:
+        try:
+            lamin, lamax = float(request.query["lamin"]), float(request.query["lamax"])
+            lomin, lomax = float(request.query["lomin"]), float(request.query["lomax"])
+        except (KeyError, ValueError):
+            return web.json_response(self.opensky)
+        states = [s for s in self.opensky["states"]
+                  if s[6] is not None and s[5] is not None and lamin <= s[6] <= lamax and lomin <= s[5] <= lomax]
+        return web.json_response({"time": self.opensky["time"], "states": states or None})
+
+    async def openweather_forecast(self, request: web.Request) -> web.Response:
+        if "q" not in request.query:
+            return web.json_response({"cod": "400", "message": "Nothing to geocode"}, status=400)
+        return web.json_response(self.forecast)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args: argparse.Namespace) -> None:
+    stubs = StubServers(args.latency, args.jitter, args.error_rate, args.new_per_poll)
+    await stubs.start(port=args.port)
+    for key, value in stubs.env().items():
+        print(f"{key}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stubs.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--new-per-poll", type=int, default=5, help="new eBay listings on each search")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
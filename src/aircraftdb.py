@@ -0,0 +1,199 @@
+"""
+Local icao24 -> registration/type index built from the OpenSky aircraft database.
+
+The CSV (https://opensky-network.org/datasets/metadata/) has several hundred
+thousand rows, far too many to parse on every start. ``build_index`` turns it
+into a compact binary file once:
+
+    header   magic (8 bytes), record count (uint32), padding (4 bytes)
+    keys     sorted icao24 addresses as uint32, one per record
+    offsets  uint32 offset of each record in the blob, plus one past the end
+    blob     tab separated registration, typecode, manufacturer, model, operator
+
+``AircraftIndex`` memory-maps that file and binary searches the key table, so
+opening it costs nothing and a lookup touches a handful of pages.
+
+    python aircraftdb.py aircraftDatabase.csv [aircraft.idx]
+"""
+import bisect
+import csv
+import logging
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import NamedTuple, Sequence
+
+import dotenv
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+AIRCRAFT_DB_FILE = Path(os.getenv("AIRCRAFT_DB_FILE", Path(__file__).parent / "aircraft.idx"))
+
+MAGIC = b"ACIDX\x00\x00\x01"
+HEADER = struct.Struct("<8sI4x")
+FIELDS = ["registration", "typecode", "manufacturername", "model", "operator", "owner"]
+
+
+class AircraftInfo(NamedTuple):
+    registration: str | None
+    typecode: str | None
+    manufacturer: str | None
+    model: str | None
+    operator: str | None
+
+    @property
+    def type_name(self) -> str | None:
+        """Short type for display, e.g. "A320" or "Cessna 172S"."""
+        return self.typecode or self.model
+
+
+def _clean(value: str | None) -> str:
+    return (value or "").replace("\t", " ").replace("\n", " ").strip()
+
+
+def build_index(csv_path: Path, path: Path = AIRCRAFT_DB_FILE) -> int:
+    """
+    Convert the OpenSky aircraft database CSV into an index file.
+
+    Rows without a valid icao24 or without any of the fields we show are
+    skipped. The file is written next to ``path`` and renamed into place, so
+    a running bot never sees a half-written index.
+
+    Returns:
+        Number of aircraft in the index
+    """
+    records = {}
+    with open(csv_path, newline="", encoding="utf-8", errors="replace") as f:
+        # Older dumps quote with double quotes, newer ones with single quotes
+        quotechar = "'" if f.read(1) == "'" else '"'
+        f.seek(0)
+        reader = csv.reader(f, quotechar=quotechar)
+        header = [_clean(name).lower() for name in next(reader)]
+        columns = [header.index(name) if name in header else None for name in ["icao24"] + FIELDS]
+        if columns[0] is None:
+            raise ValueError(f"{csv_path} has no icao24 column")
+        for row in reader:
+            values = [_clean(row[i]) if i is not None and i < len(row) else "" for i in columns]
+            try:
+                key = int(values[0], 16)
+            except ValueError:
+                continue
+            # Operator is often blank where the owner is the same company
+            registration, typecode, manufacturer, model, operator, owner = values[1:]
+            fields = [registration, typecode, manufacturer, model, operator or owner]
+            if key > 0xFFFFFF or not any(fields):
+                continue
+            records[key] = "\t".join(fields).encode()
+
+    keys = sorted(records)
+    blob = bytearray()
+    offsets = []
+    for key in keys:
+        offsets.append(len(blob))
+        blob += records[key]
+    offsets.append(len(blob))
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        f.write(struct.pack(f"<{len(keys)}I", *keys))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(blob)
+    os.replace(tmp, path)
+    logger.info(f"Built aircraft index with {len(keys)} aircraft at {path}")
+    return len(keys)
+
+
+def _uint32s(view: memoryview) -> Sequence[int]:
+    """The little-endian uint32s ``build_index`` wrote, read in place where that is the native layout."""
+    if sys.byteorder == "little" and struct.calcsize("I") == 4:
+        return view.cast("I")
+    return struct.unpack(f"<{len(view) // 4}I", view)
+
+
+class AircraftIndex:
+    """
+    Read-only lookups in an index file written by ``build_index``.
+
+    The file is opened on first use. A missing or corrupt index just means
+    every lookup returns None, so callers don't need to care whether one has
+    been built.
+    """
+
+    def __init__(self, path: Path = AIRCRAFT_DB_FILE):
+        self.path = path
+        self._mmap: mmap.mmap | None = None
+        self._view: memoryview | None = None
+        self._keys: Sequence[int] | None = None
+        self._offsets: Sequence[int] | None = None
+        self._blob_start = 0
+        self._opened = False
+
+    def _open(self) -> bool:
+        if self._opened:
+            return self._mmap is not None
+        self._opened = True
+        try:
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            logger.info(f"No aircraft index at {self.path} ({e}), aircraft won't be enriched")
+            return False
+
+        try:
+            magic, count = HEADER.unpack_from(data)
+        except struct.error:
+            magic, count = None, 0
+        if magic != MAGIC or len(data) < HEADER.size + (2 * count + 1) * 4:
+            # Treated like a missing index, e.g. a truncated copy
+            logger.error(f"{self.path} is not an aircraft index, rebuild it with aircraftdb.py")
+            data.close()
+            return False
+        view = memoryview(data)
+        keys_end = HEADER.size + count * 4
+        self._keys = _uint32s(view[HEADER.size:keys_end])
+        self._offsets = _uint32s(view[keys_end:keys_end + (count + 1) * 4])
+        self._blob_start = keys_end + (count + 1) * 4
+        self._mmap = data
+        self._view = view
+        logger.info(f"Opened aircraft index with {count} aircraft")
+        return True
+
+    def __len__(self) -> int:
+        return len(self._keys) if self._open() else 0
+
+    def get(self, icao24: str) -> AircraftInfo | None:
+        """Look up an aircraft by its hex icao24 address."""
+        if not self._open():
+            return None
+        try:
+            key = int(icao24, 16)
+        except (TypeError, ValueError):
+            return None
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return None
+        start = self._blob_start + self._offsets[i]
+        end = self._blob_start + self._offsets[i + 1]
+        fields = self._mmap[start:end].decode(errors="replace").split("\t")
+        return AircraftInfo(*(value or None for value in fields))
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            for table in (self._keys, self._offsets):
+                if isinstance(table, memoryview):
+                    table.release()
+            self._view.release()
+            self._mmap.close()
+        self._mmap = self._view = self._keys = self._offsets = None
+        self._opened = False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) not in (2, 3):
+        sys.exit(f"usage: {sys.argv[0]} aircraftDatabase.csv [index file]")
+    build_index(Path(sys.argv[1]), Path(sys.argv[2]) if len(sys.argv) == 3 else AIRCRAFT_DB_FILE)
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+from tempfile import SpooledTemporaryFile
+
+import discord
+import dotenv
+
+import httpclient
+from httpclient import Policy
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+# Attachments smaller than this stay in memory, bigger ones spill to a temporary file while downloading
+ATTACHMENT_SPOOL_BYTES = int(os.getenv("ATTACHMENT_SPOOL_BYTES", 1024 * 1024))
+ATTACHMENT_CONCURRENCY = int(os.getenv("ATTACHMENT_CONCURRENCY", 4))
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024  # Discord's limit for servers without boosts
+CHUNK_SIZE = 64 * 1024
+# Big videos take a while, but a stalled download shouldn't
+CDN_POLICY = Policy(total=300, sock_read=30, retries=2)
+httpclient.register_host("https://cdn.discordapp.com")
+httpclient.register_host("https://media.discordapp.net")
+
+
+def upload_limit(guild: discord.Guild | None) -> int:
+    """The total size of files a message may carry in ``guild``."""
+    return guild.filesize_limit if guild is not None else DEFAULT_UPLOAD_LIMIT
+
+
+async def _download(attachment: discord.Attachment) -> discord.File:
+    """Stream one attachment into a spooled temporary file."""
+    fp = SpooledTemporaryFile(max_size=ATTACHMENT_SPOOL_BYTES)
+    try:
+        async with httpclient.get(attachment.url, policy=CDN_POLICY) as resp:
+            resp.raise_for_status()
+            received = 0
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                received += len(chunk)
+                # Don't trust the CDN to send what the attachment said it would
+                if received > attachment.size:
+                    raise ValueError(f"{attachment.filename} is bigger than its declared {attachment.size} bytes")
+                fp.write(chunk)
+        fp.seek(0)
+        return discord.File(fp, filename=attachment.filename, spoiler=attachment.is_spoiler(),
+                            description=attachment.description)
+    except BaseException:
+        fp.close()
+        raise
+
+
+async def download_attachments(attachments: list[discord.Attachment],
+                               limit: int) -> tuple[list[discord.File], list[discord.Attachment]]:
+    """
+    Download attachments for re-uploading, within a total size budget.
+
+    Attachments are taken in order while their declared sizes fit in
+    ``limit``; those that don't, or fail to download, are returned separately
+    so the caller can link to them instead. Downloads run concurrently and
+    stream to memory or disk via SpooledTemporaryFile, so a large video never
+    sits in memory whole.
+
+    Returns:
+        (files to upload, attachments that weren't downloaded)
+    """
+    chosen, skipped = [], []
+    total = 0
+    for attachment in attachments:
+        if total + attachment.size <= limit:
+            chosen.append(attachment)
+            total += attachment.size
+        else:
+            skipped.append(attachment)
+    if skipped:
+        logger.info(f"{len(skipped)} attachments are over the {limit} byte upload limit, linking them instead")
+
+    semaphore = asyncio.Semaphore(ATTACHMENT_CONCURRENCY)
+
+    async def fetch(attachment: discord.Attachment) -> discord.File:
+        async with semaphore:
+            return await _download(attachment)
+
+    results = await asyncio.gather(*(fetch(attachment) for attachment in chosen), return_exceptions=True)
+    files = []
+    for attachment, result in zip(chosen, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Failed to download attachment {attachment.filename}: {result}")
+            skipped.append(attachment)
+        else:
+            files.append(result)
+    logger.debug(f"Downloaded {len(files)} attachments ({total} bytes)")
+    return files, skipped
@@ -1,32 +1,44 @@
+import asyncio
 import logging
 import os
 import random
-import re
 import subprocess
-from datetime import time
+from datetime import datetime, time
+from pathlib import Path
+from time import perf_counter
 
+import aiohttp
 import discord
 import dotenv
-import psutil
-import requests
 from discord import app_commands
 from discord.ext import commands, tasks
 
+import httpclient
 import nmap as nm
-from eb import get_new_listings, EbayAuthError, EbayAPIError
-from planes import get_nearby_aircraft
+from aircraftdb import AircraftIndex
+from attachments import download_attachments, upload_limit
+from commandsync import CommandSyncer
+from digest import digest_messages, listing_embed
+from eb import get_new_listings_for_searches, load_searches, EbayAuthError, EbayAPIError
+from httpclient import Policy
+from inventory import Change, Inventory, InventoryHost
+from linkfix import LinkRewriter
+from logsetup import sampled_logger, setup_logging
+import metrics
+from planes import M_TO_FT, Aircraft, PlanesError, get_nearby_aircraft
+from scheduler import AdaptiveInterval
+from sender import Priority, SendScheduler
+from sysmon import SystemSampler, sparkline
+from tracker import AircraftTracker, LiveMessage, TrackerUpdate
+from weather import fetch_weather
 
 dotenv.load_dotenv()
 
-# Configure logging to file only
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs.log', encoding='utf-8', mode='a')
-    ]
-)
+# Log to a rotating file from a background thread; see logsetup for the LOG_* settings
+setup_logging()
 logger = logging.getLogger(__name__)
+# on_message runs for every message in every guild, so its debug lines are sampled
+message_logger = sampled_logger(f"{__name__}.messages")
 
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_IDS = [int(id) for id in os.getenv("GUILD_IDS", "").split(",") if id]
@@ -35,7 +47,16 @@ USER_ID_JOSH = int(os.getenv("USER_ID_JOSH", 0))
 USER_ID_MAX = int(os.getenv("USER_ID_MAX", 0))
 PRIVATE_SERVER_BOT_CHANNEL_ID = int(os.getenv("PRIVATE_SERVER_BOT_CHANNEL_ID", 0))
 GENERAL_G_CHANNEL_ID = int(os.getenv("GENERAL_G_CHANNEL_ID", 0))
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
+EBAY_POLL_MIN_SECONDS = float(os.getenv("EBAY_POLL_MIN_SECONDS", 60))
+EBAY_POLL_MAX_SECONDS = float(os.getenv("EBAY_POLL_MAX_SECONDS", 900))
+INVENTORY_REFRESH_MINUTES = float(os.getenv("INVENTORY_REFRESH_MINUTES", 15))
+EBAY_DIGEST = os.getenv("EBAY_DIGEST", "1") == "1"
+EBAY_DIGEST_SUMMARY_THRESHOLD = int(os.getenv("EBAY_DIGEST_SUMMARY_THRESHOLD", 20))
+TRACKER_CHANNEL_ID = int(os.getenv("TRACKER_CHANNEL_ID", 0))
+TRACKER_POLL_SECONDS = float(os.getenv("TRACKER_POLL_SECONDS", 15))
+TRACKER_EDIT_SECONDS = float(os.getenv("TRACKER_EDIT_SECONDS", 10))
+TRACKER_LOW_ALTITUDE_FT = float(os.getenv("TRACKER_LOW_ALTITUDE_FT", 1500))
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # 0 disables the Prometheus endpoint
 
 logger.info("Configuration loaded")
 logger.debug(f"Guild IDs: {GUILD_IDS}")
@@ -44,64 +65,55 @@ logger.debug(f"General channel ID: {GENERAL_G_CHANNEL_ID}")
 
 BLOCKED_USERS = {USER_ID_JOSH}
 NETWORK_RANGES = ["192.168.5.0/24", "192.168.1.0/24"]
+HOME_LAT, HOME_LON = 51.254038, 0.437667
+FR_RADIUS_KM = 15
+# For one-off lookups a user is waiting on; a quick retry, then give up
+LOOKUP_POLICY = Policy(total=10, retries=1)
+IP_LOOKUP_URL = "https://api.ipify.org"
+# Embed fields hold 1024 characters and a whole embed 6000; /stats has five histogram fields plus a few short ones
+STATS_HISTOGRAM_CHARS = 900
+httpclient.register_host(IP_LOOKUP_URL)
+EBAY_SEARCHES = load_searches()
+INVENTORY_FILE = Path(os.getenv("INVENTORY_FILE", Path(__file__).parent / "inventory.sqlite3"))
+ebay_poll = AdaptiveInterval(EBAY_POLL_MIN_SECONDS, EBAY_POLL_MAX_SECONDS, initial=300)
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 intents.presences = True
 
-bot = commands.Bot(command_prefix="/", intents=intents)
 
-handler = logging.FileHandler(filename="logs.log", encoding="utf-8", mode="a")
-
-
-def fetch_weather():
-    logger.info("Fetching weather data for Maidstone")
-    url = f"http://api.openweathermap.org/data/2.5/forecast?q=Maidstone,GB&appid={OPENWEATHER_API_KEY}&units=metric"
-
-    with requests.Session() as session:
-        logger.debug(f"Sending weather API request to {url}")
-        resp = session.get(url)
-        logger.debug(f"Weather API response status code: {resp.status_code}")
-        if resp.status_code != 200:
-            logger.error(f"Weather API returned {resp.status_code}")
-            return None
-        data = resp.json()
-
-    forecasts = data['list'][:8]  # next 24h
-    logger.debug(f"Processing {len(forecasts)} forecast entries")
-
-    high = max(f['main']['temp_max'] for f in forecasts)
-    low = min(f['main']['temp_min'] for f in forecasts)
-    current = forecasts[0]['weather'][0]['description'].title()
-    rain_expected = any('rain' in f['weather'][0]['main'].lower() for f in forecasts)
-    logger.debug(f"Weather stats: High={high}°C, Low={low}°C, Current={current}, Rain={rain_expected}")
+class TimedCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs first for every command, so command_seconds times our own handling with a local
+        # clock rather than trusting the interaction's snowflake timestamp
+        interaction.extras["started"] = perf_counter()
+        return True
 
-    # build hourly breakdown (3-hour intervals)
-    hourly_lines = []
-    for f in forecasts[:6]:  # next 18 hours
-        time_str = f['dt_txt'].split(' ')[1][:5]  # "09:00"
-        temp = f['main']['temp']
-        icon = "🌧️" if 'rain' in f['weather'][0]['main'].lower() else "☀️"
-        hourly_lines.append(f"`{time_str}` {icon} {temp:.0f}°C")
 
-    embed = discord.Embed(
-        title="☀️ Weather for Maidstone",
-        color=0x5dadec
-    )
-    embed.add_field(name="Now", value=current, inline=False)
-    embed.add_field(name="High", value=f"{high:.0f}°C", inline=True)
-    embed.add_field(name="Low", value=f"{low:.0f}°C", inline=True)
-    embed.add_field(name="Forecast", value="\n".join(hourly_lines), inline=False)
+bot = commands.Bot(command_prefix="/", intents=intents, tree_cls=TimedCommandTree)
 
-    if rain_expected:
-        embed.add_field(name="⚠️", value="Rain expected today", inline=False)
+# Every message the bot sends goes through here, except initial interaction responses
+sender = SendScheduler()
+inventory = Inventory(INVENTORY_FILE)
+aircraft_tracker = AircraftTracker(forget_after=TRACKER_POLL_SECONDS * 4, low_altitude=TRACKER_LOW_ALTITUDE_FT / M_TO_FT)
+live_aircraft: LiveMessage | None = None
+# Registration and type for /fr; opened on first lookup, empty if the index hasn't been built
+aircraft_db = AircraftIndex()
+link_rewriter = LinkRewriter()
+command_syncer = CommandSyncer()
+system_sampler = SystemSampler()
+metrics_server = None
 
-    logger.info("Weather embed created successfully")
-    return embed
+metrics.registry.gauge("sender", sender.metrics)
+metrics.registry.gauge("ebay_poll", lambda: {"interval_seconds": ebay_poll.interval, "rate_per_second": ebay_poll.rate,
+                                             "errors": ebay_poll.errors})
+metrics.registry.gauge("links", link_rewriter.stats)
+metrics.registry.gauge("system", system_sampler.metrics)
 
 
 @tasks.loop(time=time(hour=7, minute=0))
+@metrics.timed("task_seconds", task="daily_weather")
 async def daily_weather():
     logger.info("Running daily weather task")
     channel = bot.get_channel(GENERAL_G_CHANNEL_ID)
@@ -110,9 +122,9 @@ async def daily_weather():
         return
 
     logger.debug(f"Weather channel found: {channel.name}")
-    weather_embed = fetch_weather()
+    weather_embed = await fetch_weather()
     if weather_embed:
-        await channel.send(embed=weather_embed)
+        await sender.send(channel, embed=weather_embed, priority=Priority.BACKGROUND)
         logger.info("Daily weather message sent successfully")
     else:
         logger.warning("Weather embed was None, skipping send")
@@ -136,75 +148,106 @@ def is_allowed_user():
     return app_commands.check(predicate)
 
 
-# @tasks.loop(seconds=10)
-@tasks.loop(minutes=5)
-async def check_ebay():
-    logger.info("Running eBay check task")
-    channel = bot.get_channel(PRIVATE_SERVER_BOT_CHANNEL_ID)
-    if not channel:
-        logger.error(f"eBay channel not found: {PRIVATE_SERVER_BOT_CHANNEL_ID}")
-        return
-
-    logger.debug(f"eBay channel found: {channel.name}")
-
-    try:
-        logger.debug("Calling get_new_listings()")
-        listings = get_new_listings()
-        logger.info(f"Received {len(listings)} new listings from eBay")
-
-        for idx, listing in enumerate(listings, 1):
-            logger.debug(f"Processing listing {idx}/{len(listings)}: {listing['title']}")
-            embed = discord.Embed(
-                title=listing["title"],
-                url=listing["url"],
-                color=0x00ff00
-            )
-            embed.add_field(name="Price", value=listing["price"], inline=True)
-
-            if listing["delivery"]:
-                delivery = listing["delivery"]
-                delivery_text = delivery["cost"]
-                if delivery["min_date"] and delivery["max_date"]:
-                    delivery_text += f" ({delivery['min_date']} - {delivery['max_date']})"
-                embed.add_field(name="Delivery", value=delivery_text, inline=True)
-
-            if listing["image"]:
-                embed.set_thumbnail(url=listing["image"])
-
-            await channel.send(embed=embed)
-            logger.debug(f"Sent listing {idx} to Discord")
-
-        if listings:
-            logger.info(f"Successfully posted {len(listings)} eBay listings")
-        else:
-            logger.info("No new eBay listings to post")
-
-    except EbayAuthError as e:
-        logger.error(f"eBay auth error: {e}", exc_info=True)
+async def send_ebay_error(channel, error: Exception, search_name: str):
+    if isinstance(error, EbayAuthError):
+        logger.error(f"eBay auth error ({search_name}): {error}")
         embed = discord.Embed(
             title="⚠️ eBay Authentication Error",
-            description=str(e),
+            description=str(error),
             color=0xff0000
         )
-        await channel.send(embed=embed)
-
-    except EbayAPIError as e:
-        logger.error(f"eBay API error: {e}", exc_info=True)
+    elif isinstance(error, EbayAPIError):
+        logger.error(f"eBay API error ({search_name}): {error}")
         embed = discord.Embed(
             title="⚠️ eBay API Error",
-            description=str(e),
+            description=f"**{search_name}**: {error}",
             color=0xff9900
         )
-        await channel.send(embed=embed)
-
-    except Exception as e:
-        logger.exception("Unexpected error in check_ebay")
+    else:
+        logger.error(f"Unexpected eBay error ({search_name}): {error}")
         embed = discord.Embed(
             title="❌ eBay Check Failed",
-            description=f"Unexpected error: {type(e).__name__}",
+            description=f"Unexpected error: {type(error).__name__}",
             color=0xff0000
         )
-        await channel.send(embed=embed)
+    await sender.send(channel, embed=embed, priority=Priority.BACKGROUND)
+
+
+def reschedule_ebay(new_listings: int | None):
+    """Adapt the eBay polling interval to the last poll; ``None`` means the poll failed."""
+    if new_listings is None:
+        ebay_poll.record_error()
+    else:
+        ebay_poll.record(new_listings)
+    delay = ebay_poll.next_delay()
+    check_ebay.change_interval(seconds=delay)
+    logger.info(f"Next eBay check in {delay:.0f}s (interval {ebay_poll.interval:.0f}s, "
+                f"rate {ebay_poll.rate * 3600:.1f} listings/h, errors {ebay_poll.errors})")
+
+
+@tasks.loop(seconds=ebay_poll.interval)
+@metrics.timed("task_seconds", task="check_ebay")
+async def check_ebay():
+    logger.info("Running eBay check task")
+    default_channel = bot.get_channel(PRIVATE_SERVER_BOT_CHANNEL_ID)
+    if not default_channel:
+        logger.error(f"eBay channel not found: {PRIVATE_SERVER_BOT_CHANNEL_ID}")
+        return
+
+    logger.debug(f"eBay channel found: {default_channel.name}")
+
+    try:
+        logger.debug(f"Calling get_new_listings_for_searches() for {len(EBAY_SEARCHES)} searches")
+        results = await get_new_listings_for_searches(EBAY_SEARCHES)
+    except EbayAuthError as e:
+        logger.error(f"eBay auth error: {e}", exc_info=True)
+        reschedule_ebay(None)
+        await send_ebay_error(default_channel, e, "all searches")
+        return
+    except Exception as e:
+        logger.exception("Unexpected error in check_ebay")
+        reschedule_ebay(None)
+        await send_ebay_error(default_channel, e, "all searches")
+        return
+
+    if results and all(result.error for result in results):
+        reschedule_ebay(None)
+    else:
+        reschedule_ebay(sum(len(result.listings) for result in results))
+
+    total = 0
+    pending_sends = []
+    for result in results:
+        search = result.search
+        channel = bot.get_channel(search.channel_id) if search.channel_id else default_channel
+        if not channel:
+            logger.error(f"eBay channel for search {search.name} not found: {search.channel_id}")
+            continue
+
+        if result.error:
+            await send_ebay_error(channel, result.error, search.name)
+            continue
+
+        listings = result.listings
+        logger.info(f"Received {len(listings)} new listings from eBay search {search.name}")
+        if EBAY_DIGEST:
+            batches = digest_messages(listings, search.name, EBAY_DIGEST_SUMMARY_THRESHOLD)
+            sends = [sender.submit(channel, embeds=embeds, priority=Priority.BACKGROUND) for embeds in batches]
+        else:
+            sends = [sender.submit(channel, embed=listing_embed(listing), priority=Priority.BACKGROUND)
+                     for listing in listings]
+        pending_sends.extend(sends)
+        total += len(listings)
+
+    # Queue every search's messages before waiting, so the scheduler can interleave channels
+    failures = [r for r in await asyncio.gather(*pending_sends, return_exceptions=True) if isinstance(r, Exception)]
+    if failures:
+        logger.error(f"{len(failures)} of {len(pending_sends)} eBay messages failed to send: {failures[0]}")
+
+    if total:
+        logger.info(f"Successfully posted {total} eBay listings")
+    else:
+        logger.info("No new eBay listings to post")
 
 
 @check_ebay.before_loop
@@ -215,19 +258,12 @@ async def before_check_ebay():
 @bot.event
 async def on_ready():
     logger.info("Bot is ready, starting initialization")
-    logger.debug(f"Commands in tree before sync: {[cmd.name for cmd in bot.tree.get_commands()]}")
-    logger.info("Syncing commands with Discord...")
-    print(f"Commands in tree before sync: {[cmd.name for cmd in bot.tree.get_commands()]}")
-    print(f"Syncing commands...")
-
-    # Copy global commands to each guild
-    for guild_id in GUILD_IDS:
-        logger.debug(f"Syncing commands for guild {guild_id}")
-        guild_obj = discord.Object(id=guild_id)
-        bot.tree.copy_global_to(guild=guild_obj)
-        synced = await bot.tree.sync(guild=guild_obj)
-        logger.info(f"Guild ID {guild_id}: Synced {len(synced)} commands - {[cmd.name for cmd in synced]}")
-        print(f"Guild ID {guild_id}: Synced {len(synced)} commands - {[cmd.name for cmd in synced]}")
+    logger.debug(f"Commands in tree: {[cmd.name for cmd in bot.tree.get_commands()]}")
+
+    # Runs again on every reconnect; only guilds whose commands changed are synced
+    synced = await command_syncer.sync(bot.tree, GUILD_IDS)
+    for guild_id, count in synced.items():
+        print(f"Guild ID {guild_id}: " + (f"Synced {count} commands" if count is not None else "sync failed"))
 
     logger.info(f"Logged in as {bot.user.name} (ID: {bot.user.id})")
     print(f"Logged in as {bot.user.name} ({bot.user.id})")
@@ -238,38 +274,84 @@ async def on_ready():
     else:
         logger.debug("eBay check task already running")
 
+    if not refresh_inventory.is_running():
+        logger.info("Starting inventory refresh task")
+        refresh_inventory.start()
+    else:
+        logger.debug("Inventory refresh task already running")
+
+    if TRACKER_CHANNEL_ID and not track_aircraft.is_running():
+        logger.info("Starting aircraft tracker task")
+        track_aircraft.start()
+
+    if not system_sampler.is_running():
+        system_sampler.start()
+
     if not daily_weather.is_running():
         logger.info("Starting daily weather task")
         daily_weather.start()
     else:
         logger.debug("Daily weather task already running")
 
+    global metrics_server
+    if METRICS_PORT and metrics_server is None:
+        try:
+            metrics_server = await metrics.start_server(METRICS_PORT)
+        except OSError as e:
+            logger.error(f"Could not start metrics server on port {METRICS_PORT}: {e}")
+
+
+def command_elapsed(interaction: discord.Interaction) -> float | None:
+    started = interaction.extras.get("started")
+    return None if started is None else perf_counter() - started
+
 
 @bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command: app_commands.Command):
+    elapsed = command_elapsed(interaction)
+    if elapsed is not None:
+        metrics.observe("command_seconds", elapsed, command=command.qualified_name, status="ok")
+
+
+@bot.tree.error
+async def on_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    elapsed = command_elapsed(interaction)
+    name = interaction.command.qualified_name if interaction.command else "unknown"
+    status = "denied" if isinstance(error, app_commands.CheckFailure) else "error"
+    if elapsed is not None:
+        metrics.observe("command_seconds", elapsed, command=name, status=status)
+    if status == "error":
+        logger.error(f"Error in /{name}: {error}", exc_info=error)
+
+
+@bot.event
+@metrics.timed("on_message_seconds")
 async def on_message(message: discord.Message):
     if message.author == bot.user:
         return
 
-    logger.debug(f"Message received from {message.author.name} ({message.author.id}): {message.content[:50]}")
+    # Lazy %-formatting, so dropped samples never build the string
+    message_logger.debug("Message received from %s (%s): %.50s", message.author.name, message.author.id,
+                         message.content)
 
     if message.author.id == USER_ID_JOSH:
         logger.debug(f"Adding reactions to Josh's message")
         for emoji in ["🇬", "0️⃣", "🇴", "🇳"]:
             await message.add_reaction(emoji)
 
-    if "x.com/" in message.content:
-        logger.info(f"Detected x.com link in message from {message.author.name}")
-        x_links = re.findall(r"https?://(?:www\.)?x\.com/\S+", message.content)
-        if x_links:
-            logger.debug(f"Found {len(x_links)} x.com links, converting to fixupx")
-            new_content = re.sub(r"https?://(?:www\.)?x\.com/", "https://fixupx.com/", message.content)
-
-            new_content = re.sub(r"\?s=[^\s]*", "", new_content)
+    new_content = link_rewriter.rewrite(message.content)
+    if new_content is not None:
+        logger.info(f"Rewrote links in message from {message.author.name}")
+        final_message = f"{message.author.mention}: {new_content}"
 
-            final_message = f"{message.author.mention}: {new_content}"
-
-            files = [await attachment.to_file() for attachment in message.attachments]
+        files, linked = await download_attachments(message.attachments, upload_limit(message.guild))
+        for attachment in linked:
+            if len(final_message) + len(attachment.url) + 1 > 2000:
+                break
+            final_message += f"\n{attachment.url}"
 
+        # Attachment links die with their message, so keep the original if any files couldn't be re-uploaded
+        if not linked:
             try:
                 await message.delete()
                 logger.debug("Original message deleted")
@@ -277,16 +359,65 @@ async def on_message(message: discord.Message):
                 logger.warning("Could not delete original message (forbidden)")
                 pass
 
-            await message.channel.send(final_message, files=files if files else None)
-            logger.info("Sent fixupx replacement message")
+        try:
+            await sender.send(message.channel, final_message, files=files if files else None)
+        finally:
+            for file in files:
+                file.close()
+        logger.info("Sent rewritten replacement message")
 
     if message and random.randint(1, 1000) == 1:
         logger.info("Random 1 in 1000 event triggered!")
-        await message.channel.send("1 in 1000!")
+        await sender.send(message.channel, "1 in 1000!")
 
     await bot.process_commands(message)
 
 
+def fit_lines(lines: list[str], limit: int = 2000, prefix: str = "", suffix: str = "",
+              more: str = "*...and {} more*") -> str:
+    """
+    Join ``lines`` between ``prefix`` and ``suffix`` in at most ``limit`` characters.
+
+    Lines that don't fit are dropped from the end and replaced by ``more``,
+    formatted with how many were dropped.
+    """
+    content = prefix + "\n".join(lines) + suffix
+    if len(content) <= limit:
+        return content
+    reserve = len(more.format(len(lines))) + 1
+    body = ""
+    for i, line in enumerate(lines):
+        needed = len(prefix) + len(body) + len(line) + 1 + len(suffix)
+        if needed + (reserve if i < len(lines) - 1 else 0) > limit:
+            body += more.format(len(lines) - i) + "\n"
+            break
+        body += line + "\n"
+    return prefix + body.rstrip("\n") + suffix
+
+
+def format_aircraft(ac: Aircraft) -> str:
+    callsign = ac.callsign or "Unknown"
+    if ac.on_ground:
+        alt_ft = "ground"
+    else:
+        alt_ft = f"{ac.altitude_ft}ft" if ac.altitude_ft is not None else "?ft"
+    spd_kts = ac.speed_kts if ac.speed_kts is not None else "?"
+
+    climb_indicator = ""
+    if ac.vertical_rate:
+        if ac.vertical_rate > 0.5:
+            climb_indicator = " ↗"
+        elif ac.vertical_rate < -0.5:
+            climb_indicator = " ↘"
+
+    # Link to FlightRadar24 if we have a valid callsign
+    name = f"[{callsign}](https://www.flightradar24.com/{callsign})" if ac.callsign else callsign
+    info = aircraft_db.get(ac.icao24)
+    details = " ".join(d for d in (info.type_name, info.registration) if d) if info else ""
+    return (f"✈️ **{name}**{' ' + details if details else ''} ({ac.origin_country or '?'}) - "
+            f"{alt_ft}, {spd_kts}kts{climb_indicator}, {ac.distance_km:.1f}km {ac.compass}")
+
+
 @bot.tree.command(name="fr", description="Show aircraft currently flying nearby")
 #@is_allowed_user()
 async def fr(interaction: discord.Interaction):
@@ -295,59 +426,137 @@ async def fr(interaction: discord.Interaction):
 
     try:
         logger.debug("Fetching nearby aircraft data")
-        aircraft_list = get_nearby_aircraft(51.254038, 0.437667, radius_km=15)
-        logger.debug(f"Found {len(aircraft_list) if aircraft_list else 0} aircraft")
+        aircraft_list = await get_nearby_aircraft(HOME_LAT, HOME_LON, radius_km=FR_RADIUS_KM)
+        logger.debug(f"Found {len(aircraft_list)} aircraft")
 
         if not aircraft_list:
             logger.info("No aircraft found nearby")
-            await interaction.followup.send("No aircraft detected nearby.")
+            await sender.send(interaction.followup, "No aircraft detected nearby.", priority=Priority.INTERACTIVE)
             return
 
-        lines = []
-        for ac in aircraft_list:
-            callsign = (ac[1] or "").strip() or "Unknown"
-            origin_country = ac[2] or "?"
-            altitude = ac[7]
-            velocity = ac[9]
-            vertical_rate = ac[11]  # meters/second
-
-            alt_ft = int(altitude * 3.281) if altitude else "?"
-            spd_kts = int(velocity * 1.944) if velocity else "?"
-
-            # Calculate climb/descent indicator
-            climb_indicator = ""
-            if vertical_rate:
-                if vertical_rate > 0.5:
-                    climb_indicator = " ↗"
-                elif vertical_rate < -0.5:
-                    climb_indicator = " ↘"
-
-            # Create FlightRadar24 link if we have a valid callsign
-            if callsign != "Unknown":
-                fr_link = f"https://www.flightradar24.com/{callsign}"
-                lines.append(f"✈️ **[{callsign}]({fr_link})** ({origin_country}) - {alt_ft}ft, {spd_kts}kts{climb_indicator}")
-            else:
-                lines.append(f"✈️ **{callsign}** ({origin_country}) - {alt_ft}ft, {spd_kts}kts{climb_indicator}")
+        lines = [format_aircraft(ac) for ac in aircraft_list]
+        # Type and registration make each line over 100 characters, so fit by length rather than line count
+        response = fit_lines(lines)
 
-        response = "\n".join(lines)
-        if len(response) > 1900:
-            response = "\n".join(lines[:20]) + f"\n\n*...and {len(lines) - 20} more*"
-            logger.debug("Response truncated due to length")
-
-        await interaction.followup.send(response)
+        await sender.send(interaction.followup, response, priority=Priority.INTERACTIVE)
         logger.info(f"Sent aircraft list with {len(lines)} aircraft to {interaction.user.name}")
     except Exception as e:
         logger.error(f"Error in /fr command: {e}", exc_info=True)
-        await interaction.followup.send(f"Error: {e}")
+        await sender.send(interaction.followup, f"Error: {e}", priority=Priority.INTERACTIVE)
+
+
+def format_live_aircraft(update: TrackerUpdate) -> str:
+    lines = [f"📡 **Live aircraft within {FR_RADIUS_KM}km**"]
+    entered = {track.icao24 for track in update.entered}
+    for track in update.current:
+        lines.append(format_aircraft(track.aircraft) + (" 🆕" if track.icao24 in entered else ""))
+    if not update.current:
+        lines.append("No aircraft detected nearby.")
+    if update.left:
+        lines.append("Left: " + ", ".join(track.aircraft.callsign or track.icao24 for track in update.left))
+
+    content = ""
+    for i, line in enumerate(lines):
+        if len(content) + len(line) + 40 > 2000:
+            content += f"*...and {len(lines) - i} more*"
+            break
+        content += line + "\n"
+    return content.rstrip()
+
+
+def format_alert(kind: str, ac: Aircraft) -> str:
+    name = ac.callsign or ac.icao24
+    alt = f"{ac.altitude_ft}ft" if ac.altitude_ft is not None else "?ft"
+    if kind == "low":
+        return f"⚠️ **{name}** is low: {alt}, {ac.distance_km:.1f}km {ac.compass}"
+    return f"✈️ **{name}** entered the zone: {alt}, {ac.distance_km:.1f}km {ac.compass}"
+
+
+@tasks.loop(seconds=TRACKER_POLL_SECONDS)
+@metrics.timed("task_seconds", task="track_aircraft")
+async def track_aircraft():
+    global live_aircraft
+    channel = bot.get_channel(TRACKER_CHANNEL_ID)
+    if not channel:
+        logger.error(f"Tracker channel not found: {TRACKER_CHANNEL_ID}")
+        return
+
+    try:
+        aircraft_list = await get_nearby_aircraft(HOME_LAT, HOME_LON, radius_km=FR_RADIUS_KM)
+    except PlanesError as e:
+        logger.warning(f"Aircraft tracker poll failed: {e}")
+        return
+
+    update = aircraft_tracker.update(aircraft_list)
+    if live_aircraft is None:
+        # Never coalesced: the message is edited in place later, which would wipe anything merged into it
+        live_aircraft = LiveMessage(lambda content: sender.send(channel, content, priority=Priority.BACKGROUND,
+                                                                coalesce=False),
+                                    min_interval=TRACKER_EDIT_SECONDS)
+    await live_aircraft.update(format_live_aircraft(update))
+    sends = []
+    for alert in update.alerts:
+        logger.info(f"Aircraft alert: {alert.kind} {alert.aircraft.icao24}")
+        sends.append(sender.submit(channel, format_alert(alert.kind, alert.aircraft), priority=Priority.BACKGROUND))
+    await asyncio.gather(*sends, return_exceptions=True)
+
+
+@track_aircraft.before_loop
+async def before_track_aircraft():
+    await bot.wait_until_ready()
+
+
+@bot.tree.command(name="ebay", description="Show eBay polling status")
+@is_allowed_user()
+async def ebay(interaction: discord.Interaction):
+    logger.info(f"Command /ebay invoked by {interaction.user.name} ({interaction.user.id})")
+    embed = discord.Embed(title="🛒 eBay Polling", color=0x00ff00)
+    embed.add_field(name="Searches", value=", ".join(search.name for search in EBAY_SEARCHES), inline=False)
+    embed.add_field(name="Interval", value=f"{ebay_poll.interval:.0f}s", inline=True)
+    embed.add_field(name="Rate", value=f"{ebay_poll.rate * 3600:.1f} listings/h", inline=True)
+    embed.add_field(name="Errors", value=str(ebay_poll.errors), inline=True)
+    if check_ebay.next_iteration:
+        embed.add_field(name="Next check", value=discord.utils.format_dt(check_ebay.next_iteration, "R"), inline=False)
+    await interaction.response.send_message(embed=embed)
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}TB"
+
+
+def format_system() -> str:
+    sample = system_sampler.latest()
+    if sample is None:
+        return f"No samples yet, the first arrives {system_sampler.interval:.0f}s after startup."
+
+    lines = [f"CPU {sample.cpu:5.1f}%  cores " + " ".join(f"{core:.0f}" for core in sample.per_cpu),
+             f"{'':8}{'min':>7}{'avg':>7}{'max':>7}"]
+    for minutes in (1, 5, 15):
+        # Empty if the sampler interval is longer than the window, or the thread has stalled
+        summary = system_sampler.summary("cpu", minutes * 60)
+        if summary is None:
+            lines.append(f"{f'{minutes}m':<8}{'n/a':>7}{'n/a':>7}{'n/a':>7}")
+        else:
+            low, avg, high = summary
+            lines.append(f"{f'{minutes}m':<8}{low:>6.1f}%{avg:>6.1f}%{high:>6.1f}%")
+    lines.append(f"15m     {sparkline([s.cpu for s in system_sampler.window(15 * 60)])}")
+    lines.append(f"Memory  {sample.memory:.1f}% ({format_bytes(sample.memory_used)})")
+    lines.append("Load    " + " ".join(f"{load:.2f}" for load in sample.load))
+    lines.append(f"Disk    {format_bytes(sample.disk_read)}/s read, {format_bytes(sample.disk_write)}/s write")
+    lines.append(f"Network {format_bytes(sample.net_recv)}/s in, {format_bytes(sample.net_sent)}/s out")
+    return "```\n" + "\n".join(lines) + "```"
 
 
 @bot.tree.command(name="cpu", description="Show current CPU usage")
 @is_allowed_user()
 async def cpu(interaction: discord.Interaction):
     logger.info(f"Command /cpu invoked by {interaction.user.name} ({interaction.user.id})")
-    cpu_usage = psutil.cpu_percent(interval=1)
-    logger.debug(f"CPU usage: {cpu_usage}%")
-    await interaction.response.send_message(f"{cpu_usage}%")
+    # Answered from the background sampler's history, so this never waits on a measurement
+    await interaction.response.send_message(format_system())
 
 
 @bot.tree.command(name="ip", description="Get public and private IP addresses")
@@ -358,7 +567,8 @@ async def ip(interaction: discord.Interaction):
         return
 
     try:
-        public_ip = requests.get("https://api.ipify.org", timeout=10).text
+        async with httpclient.get(IP_LOOKUP_URL, policy=LOOKUP_POLICY) as resp:
+            public_ip = await resp.text()
         result = subprocess.run(["hostname", "-I"], capture_output=True, text=True, timeout=5)
         private_ip = result.stdout.strip()
         await interaction.response.send_message(f"**Public:** {public_ip}\n**Private:** {private_ip}")
@@ -366,9 +576,50 @@ async def ip(interaction: discord.Interaction):
         await interaction.response.send_message(f"Error: {e}")
 
 
+def format_host(host: nm.Host | InventoryHost) -> str:
+    details = [host.vendor or host.mac, f"{host.latency * 1000:.1f}ms" if host.latency is not None else None]
+    return "  ".join([host.address.ljust(15)] + [d for d in details if d]).rstrip()
+
+
+def format_open_ports(host: nm.Host | InventoryHost) -> str:
+    lines = [f"  {str(port).ljust(9)} {port.service or ''}".rstrip() for port in host.open_ports]
+    return f"```\n{host.address}:\n{chr(10).join(lines)}```"
+
+
+def format_changes(changes: list[Change], title: str) -> str:
+    if not changes:
+        return f"{title}: none"
+    lines = [str(change) for change in changes[-30:]]
+    if len(changes) > 30:
+        lines.insert(0, f"...and {len(changes) - 30} earlier")
+    return fit_lines(lines, prefix=f"{title}:\n```\n", suffix="```", more="...and {} more")
+
+
+def inventory_age() -> str:
+    if inventory.refreshed_at is None:
+        return "from the saved inventory"
+    return f"as of {discord.utils.format_dt(datetime.fromtimestamp(inventory.refreshed_at), 'R')}"
+
+
+@tasks.loop(minutes=INVENTORY_REFRESH_MINUTES)
+@metrics.timed("task_seconds", task="refresh_inventory")
+async def refresh_inventory():
+    logger.info("Running inventory refresh task")
+    try:
+        await inventory.refresh(NETWORK_RANGES)
+    except RuntimeError as e:
+        logger.error(f"Inventory refresh failed: {e}")
+
+
+@refresh_inventory.before_loop
+async def before_refresh_inventory():
+    await bot.wait_until_ready()
+
+
 @bot.tree.command(name="scan", description="Ping scan for known network ranges")
+@app_commands.describe(fresh="Rescan now instead of answering from the inventory")
 @is_allowed_user()
-async def scan(interaction: discord.Interaction):
+async def scan(interaction: discord.Interaction, fresh: bool = False):
     logger.info(f"Command /scan invoked by {interaction.user.name} ({interaction.user.id})")
     await interaction.response.defer()
     if interaction.user.id != USER_ID_MAX:
@@ -377,43 +628,85 @@ async def scan(interaction: discord.Interaction):
         return
 
     try:
-        logger.debug(f"Starting network scan on ranges: {NETWORK_RANGES}")
-        hosts = nm.discover_hosts(NETWORK_RANGES)
-        logger.info(f"Scan completed, found {len(hosts) if hosts else 0} hosts")
+        if fresh or inventory.is_empty:
+            logger.debug(f"Starting network scan on ranges: {NETWORK_RANGES}")
+            changes = await inventory.refresh(NETWORK_RANGES)
+            changes_title = "Changes"
+        else:
+            changes = inventory.recent_changes(datetime.now().timestamp() - 86400)
+            changes_title = "Changes in the last 24h"
+
+        hosts = inventory.live_hosts()
+        logger.info(f"Scan answered with {len(hosts)} hosts")
         if hosts:
-            await interaction.followup.send(f"```\n{chr(10).join(hosts)}```")
+            # Separate messages, since on a first run every host is also a change
+            await sender.send(interaction.followup,
+                              fit_lines(list(map(format_host, hosts)),
+                                        prefix=f"{len(hosts)} hosts up {inventory_age()}\n```\n",
+                                        suffix="```", more="...and {} more"),
+                              priority=Priority.INTERACTIVE)
+            await sender.send(interaction.followup, format_changes(changes, changes_title),
+                              priority=Priority.INTERACTIVE)
         else:
-            await interaction.followup.send("No hosts found.")
+            await sender.send(interaction.followup, "No hosts found.", priority=Priority.INTERACTIVE)
     except RuntimeError as e:
         logger.error(f"Error in /scan command: {e}", exc_info=True)
-        await interaction.followup.send(f"Error: {e}")
+        await sender.send(interaction.followup, f"Error: {e}", priority=Priority.INTERACTIVE)
 
 
 @bot.tree.command(name="portscan", description="Scan local network for devices and open ports")
+@app_commands.describe(fresh="Rescan every host's ports now instead of answering from the inventory")
 @is_allowed_user()
-async def portscan(interaction: discord.Interaction):
+async def portscan(interaction: discord.Interaction, fresh: bool = False):
     await interaction.response.defer()
     if interaction.user.id != USER_ID_MAX:
         await interaction.response.send_message("Access denied.", ephemeral=True)
         return
 
     try:
-        await interaction.followup.send("Discovering hosts...")
-        hosts = nm.discover_hosts(NETWORK_RANGES)
-
-        if not hosts:
-            await interaction.followup.send("No hosts found.")
-            return
-
-        await interaction.followup.send(f"Found {len(hosts)} hosts. Scanning ports...")
-        port_results = nm.scan_ports(hosts)
-
-        for host, ports in port_results.items():
-            if ports:
-                await interaction.followup.send(f"```\n{host}:\n  {chr(10) + '  '.join(ports)}```")
+        sends = []
+        scanned = [host for host in inventory.live_hosts() if host.ports_scanned_at is not None]
+        if scanned and not fresh:
+            hosts = [host for host in scanned if host.open_ports]
+            if hosts:
+                await sender.send(interaction.followup, f"Open ports {inventory_age()}:",
+                                  priority=Priority.INTERACTIVE)
+            else:
+                await sender.send(interaction.followup, f"No open ports {inventory_age()}.",
+                                  priority=Priority.INTERACTIVE)
+            sends += [sender.submit(interaction.followup, format_open_ports(host), priority=Priority.INTERACTIVE)
+                      for host in hosts]
+            changes = [change for change in inventory.recent_changes(datetime.now().timestamp() - 86400)
+                       if change.kind.startswith("port")]
+            sends.append(sender.submit(interaction.followup, format_changes(changes, "Port changes in the last 24h"),
+                                       priority=Priority.INTERACTIVE))
+        else:
+            await sender.send(interaction.followup, "Scanning hosts...", priority=Priority.INTERACTIVE)
+
+            # Post each host as soon as its scan finishes
+            def post_ports(host: InventoryHost):
+                if host.open_ports:
+                    sends.append(sender.submit(interaction.followup, format_open_ports(host),
+                                               priority=Priority.INTERACTIVE))
+
+            changes = await inventory.refresh(NETWORK_RANGES, port_rescan_age=0 if fresh else 6 * 3600,
+                                              on_ports=post_ports)
+            if not sends:
+                # Nothing needed rescanning (or we joined a refresh already running), so answer from the inventory
+                for host in inventory.live_hosts():
+                    post_ports(host)
+            if not inventory.live_hosts():
+                sends.append(sender.submit(interaction.followup, "No hosts found.", priority=Priority.INTERACTIVE))
+            else:
+                if not sends:
+                    sends.append(sender.submit(interaction.followup, "No open ports found.",
+                                               priority=Priority.INTERACTIVE))
+                sends.append(sender.submit(interaction.followup, format_changes(changes, "Changes"),
+                                           priority=Priority.INTERACTIVE))
+        await asyncio.gather(*sends)
 
     except RuntimeError as e:
-        await interaction.followup.send(f"Error: {e}")
+        await sender.send(interaction.followup, f"Error: {e}", priority=Priority.INTERACTIVE)
 
 
 @bot.tree.command(name="robots", description="Fetch robots.txt from a website")
@@ -424,19 +717,21 @@ async def robots(interaction: discord.Interaction, url: str):
     target = url.replace("https://", "").replace("http://", "").rstrip("/")
 
     try:
-        response = requests.get(f"https://{target}/robots.txt", timeout=10)
-        content = response.text
+        async with httpclient.get(f"https://{target}/robots.txt", policy=LOOKUP_POLICY) as resp:
+            content = await resp.text()
 
         if not content:
-            await interaction.followup.send("Empty or no robots.txt found.")
+            await sender.send(interaction.followup, "Empty or no robots.txt found.", priority=Priority.INTERACTIVE)
             return
 
         chunks = [content[i: i + 1990] for i in range(0, len(content), 1990)]
-        for chunk in chunks:
-            await interaction.followup.send(f"```\n{chunk}```")
+        await asyncio.gather(*(
+            sender.submit(interaction.followup, f"```\n{chunk}```", priority=Priority.INTERACTIVE)
+            for chunk in chunks
+        ))
 
-    except requests.RequestException as e:
-        await interaction.followup.send(f"Error fetching robots.txt: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        await sender.send(interaction.followup, f"Error fetching robots.txt: {e}", priority=Priority.INTERACTIVE)
 
 
 @bot.tree.command(name="tuah", description="Reveal the tuah image")
@@ -453,15 +748,65 @@ async def weather(interaction: discord.Interaction):
     logger.info(f"Command /weather invoked by {interaction.user.name} ({interaction.user.id})")
     await interaction.response.defer()
 
-    weather_embed = fetch_weather()
+    weather_embed = await fetch_weather()
     if weather_embed:
-        await interaction.followup.send(embed=weather_embed)
+        await sender.send(interaction.followup, embed=weather_embed, priority=Priority.INTERACTIVE)
         logger.info(f"Weather data sent to {interaction.user.name}")
     else:
         logger.warning("Failed to fetch weather data")
-        await interaction.followup.send("Failed to fetch weather data.")
+        await sender.send(interaction.followup, "Failed to fetch weather data.", priority=Priority.INTERACTIVE)
+
+
+def format_histograms(name: str, label: str, limit: int = STATS_HISTOGRAM_CHARS) -> str:
+    lines = []
+    for labels, histogram in sorted(metrics.registry.histograms.get(name, {}).items()):
+        labels = dict(labels)
+        key = labels.get(label, name)
+        if labels.get("status", "ok") not in ("ok", "200"):
+            key += f" [{labels['status']}]"
+        lines.append(f"{key[:24]:24} {histogram.count:>6} {histogram.quantile(0.5) * 1000:>8.0f} "
+                     f"{histogram.quantile(0.99) * 1000:>8.0f}")
+    if not lines:
+        return "No data yet"
+    header = f"{'':24} {'count':>6} {'p50 ms':>8} {'p99 ms':>8}"
+    return fit_lines(lines, limit, prefix=f"```\n{header}\n", suffix="```", more="...and {} more")
+
+
+@bot.tree.command(name="stats", description="Show bot latency and queue metrics")
+async def stats(interaction: discord.Interaction):
+    if interaction.user.id != USER_ID_MAX:
+        await interaction.response.send_message("Access denied.", ephemeral=True)
+        return
+    logger.info(f"Command /stats invoked by {interaction.user.name} ({interaction.user.id})")
+
+    embed = discord.Embed(title="📊 Bot Stats", color=0x5dadec)
+    embed.add_field(name="Commands", value=format_histograms("command_seconds", "command"), inline=False)
+    embed.add_field(name="Tasks", value=format_histograms("task_seconds", "task"), inline=False)
+    embed.add_field(name="Upstream HTTP", value=format_histograms("http_request_seconds", "host"), inline=False)
+    circuits = [f"{host}: {circuit['state']}" for host, circuit in httpclient.stats().items()
+                if circuit["state"] != "closed"]
+    embed.add_field(name="Circuits", value=fit_lines(circuits, 400, more="...and {} more") or "All closed",
+                    inline=False)
+    embed.add_field(name="on_message", value=format_histograms("on_message_seconds", "status"), inline=False)
+    embed.add_field(name="nmap", value=format_histograms("nmap_seconds", "scan"), inline=False)
+
+    queue = sender.metrics()
+    embed.add_field(name="Send queue", value=f"{queue['queue_depth']} queued, {queue['sent']} sent, "
+                                             f"{queue['coalesced']} coalesced, {queue['failed']} failed\n"
+                                             f"wait avg {queue['avg_wait']:.2f}s, max {queue['max_wait']:.2f}s",
+                    inline=False)
+    embed.add_field(name="eBay polling", value=f"every {ebay_poll.interval:.0f}s, "
+                                               f"{ebay_poll.rate * 3600:.1f} listings/h, {ebay_poll.errors} errors",
+                    inline=False)
+    links = link_rewriter.stats()
+    embed.add_field(name="Links", value=f"{links['rewritten']} of {links['messages']} messages rewritten",
+                    inline=False)
+    if METRICS_PORT:
+        embed.set_footer(text=f"Prometheus metrics on 127.0.0.1:{METRICS_PORT}/metrics")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 if __name__ == "__main__":
     logger.info("Starting Discord bot")
-    bot.run(DISCORD_TOKEN, log_handler=handler, log_level=logging.DEBUG)
+    # Logging is already set up, so stop discord.py adding its own handler
+    bot.run(DISCORD_TOKEN, log_handler=None)
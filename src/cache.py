@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value: Any, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class AsyncTTLCache:
+    """
+    Small async cache with request coalescing and stale-while-revalidate.
+
+    Entries are fresh for ``ttl`` seconds. For ``stale_ttl`` seconds after that
+    they are still returned immediately while a background refresh runs.
+    Concurrent requests for a key that has to be loaded share one in-flight
+    load, so a burst of callers costs a single upstream call. A loader that
+    raises leaves the cache unchanged; during a background refresh the stale
+    value keeps being served.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_entries: int = 128):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def age(self, key: Hashable) -> float | None:
+        entry = self._entries.get(key)
+        return None if entry is None else time.monotonic() - entry.fetched_at
+
+    def fresh_items(self, max_age: float | None = None) -> list[tuple[Hashable, Any]]:
+        """All (key, value) pairs younger than ``max_age`` seconds, by default the ones that are still fresh."""
+        max_age = self.ttl if max_age is None else max_age
+        now = time.monotonic()
+        return [(key, entry.value) for key, entry in self._entries.items() if now - entry.fetched_at < max_age]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = _Entry(value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``loader`` if it is missing or too old."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl:
+                self.hits += 1
+                return entry.value
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                logger.debug(f"Serving stale {key!r} ({age:.0f}s old), refreshing in background")
+                self._load(key, loader)
+                return entry.value
+
+        self.misses += 1
+        # Shield so one caller being cancelled doesn't cancel the load the others are waiting on
+        return await asyncio.shield(self._load(key, loader))
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, loader))
+            task.add_done_callback(self._log_background_error)
+            self._inflight[key] = task
+        return task
+
+    async def _run(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self.put(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Task) -> None:
+        # Retrieve the exception so background refreshes nobody awaited don't warn at shutdown
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cache load failed: {task.exception()}")
@@ -0,0 +1,100 @@
+"""
+Slash command syncing that skips guilds whose commands haven't changed.
+
+``on_ready`` runs again on every gateway reconnect, and syncing costs an API
+call per guild against a tight rate limit. The payload Discord would be sent
+is hashed per guild and the hashes are kept in a JSON file, so a guild is
+only synced when its commands actually changed since the last successful
+sync, even across restarts.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import discord
+import dotenv
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+COMMAND_SYNC_FILE = Path(os.getenv("COMMAND_SYNC_FILE", Path(__file__).parent / "command_sync.json"))
+# Set to 1 to sync every guild on the next start regardless of the stored hashes
+COMMAND_SYNC_FORCE = os.getenv("COMMAND_SYNC_FORCE", "0") == "1"
+
+
+def tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake) -> str:
+    """SHA-256 of the command payload ``tree.sync`` would send for ``guild``."""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command.get("type", 1), command["name"]))
+    blob = json.dumps([tree.client.application_id, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class CommandSyncer:
+    """Remembers what was last synced to each guild and only syncs what changed."""
+
+    def __init__(self, path: Path = COMMAND_SYNC_FILE):
+        self.path = path
+        self.hashes: dict[str, str] = self._load()
+
+    def _load(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable command sync state {self.path}: {e}")
+            return {}
+        return {str(key): str(value) for key, value in data.items()} if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.hashes, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save command sync state to {self.path}: {e}")
+
+    async def sync(self, tree: app_commands.CommandTree, guild_ids: list[int],
+                   force: bool = COMMAND_SYNC_FORCE) -> dict[int, int | None]:
+        """
+        Copy the global commands to each guild and sync the guilds whose commands changed.
+
+        Needed syncs run concurrently. A guild that fails to sync keeps its
+        old hash, so it is retried on the next ``on_ready``.
+
+        Returns:
+            Number of commands synced per guild that was synced, or None where the sync failed
+        """
+        pending = {}
+        for guild_id in guild_ids:
+            guild = discord.Object(id=guild_id)
+            tree.copy_global_to(guild=guild)
+            digest = tree_hash(tree, guild)
+            if force or self.hashes.get(str(guild_id)) != digest:
+                pending[guild_id] = digest
+        skipped = len(guild_ids) - len(pending)
+        if not pending:
+            logger.info(f"Commands unchanged in all {skipped} guilds, not syncing")
+            return {}
+
+        logger.info(f"Syncing commands to {len(pending)} guilds ({skipped} unchanged)")
+        results = await asyncio.gather(*(tree.sync(guild=discord.Object(id=guild_id)) for guild_id in pending),
+                                       return_exceptions=True)
+        synced = {}
+        for (guild_id, digest), result in zip(pending.items(), results):
+            if isinstance(result, BaseException):
+                logger.error(f"Guild ID {guild_id}: command sync failed: {result}")
+                synced[guild_id] = None
+                continue
+            self.hashes[str(guild_id)] = digest
+            synced[guild_id] = len(result)
+            logger.info(f"Guild ID {guild_id}: Synced {len(result)} commands - {[cmd.name for cmd in result]}")
+        self._save()
+        return synced
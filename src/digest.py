@@ -0,0 +1,106 @@
+import logging
+import re
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord limits for a single message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_DESCRIPTION_CHARS = 4096
+
+LISTING_COLOR = 0x00ff00
+
+
+def listing_embed(listing: dict) -> discord.Embed:
+    """Build the embed for one listing from ``eb.format_listing`` output."""
+    embed = discord.Embed(
+        title=listing["title"],
+        url=listing["url"],
+        color=LISTING_COLOR
+    )
+    embed.add_field(name="Price", value=listing["price"], inline=True)
+    if listing["delivery"]:
+        embed.add_field(name="Delivery", value=listing["delivery"]["text"], inline=True)
+    if listing["image"]:
+        embed.set_thumbnail(url=listing["image"])
+    return embed
+
+
+def pack_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    """
+    Group embeds into as few messages as possible.
+
+    Each group respects Discord's limits of 10 embeds and 6000 embed characters
+    per message, and the original order is kept.
+    """
+    batches = []
+    batch = []
+    batch_chars = 0
+    for embed in embeds:
+        size = len(embed)
+        if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or batch_chars + size > MAX_EMBED_CHARS_PER_MESSAGE):
+            batches.append(batch)
+            batch = []
+            batch_chars = 0
+        batch.append(embed)
+        batch_chars += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def summary_line(listing: dict) -> str:
+    """One listing as a markdown link; the title is escaped so brackets or asterisks in it can't break the link."""
+    # escape_markdown only escapes "[" where it looks like the start of a link, and never "]"
+    title = re.sub(r"(?<!\\)([\[\]])", r"\\\1", discord.utils.escape_markdown(listing["title"][:80]))
+    line = f"[{title}]({listing['url']}) — {listing['price']}"
+    if len(line) > MAX_DESCRIPTION_CHARS:
+        # Only an absurd URL gets here; the title alone still fits
+        line = f"{title} — {listing['price']}"[:MAX_DESCRIPTION_CHARS]
+    return line
+
+
+def summary_embeds(listings: list[dict], search_name: str) -> list[discord.Embed]:
+    """Collapse listings into compact one-line-per-listing embeds."""
+    lines = [summary_line(listing) for listing in listings]
+
+    embeds = []
+    chunk = []
+    chunk_chars = 0
+    for line in lines:
+        if chunk and chunk_chars + len(line) + 1 > MAX_DESCRIPTION_CHARS:
+            embeds.append(chunk)
+            chunk = []
+            chunk_chars = 0
+        chunk.append(line)
+        chunk_chars += len(line) + 1
+    if chunk:
+        embeds.append(chunk)
+
+    return [
+        discord.Embed(
+            title=f"🛒 {len(listings)} new listings: {search_name}" + (f" ({page}/{len(embeds)})" if len(embeds) > 1 else ""),
+            description="\n".join(chunk),
+            color=LISTING_COLOR
+        )
+        for page, chunk in enumerate(embeds, 1)
+    ]
+
+
+def digest_messages(listings: list[dict], search_name: str, summary_threshold: int) -> list[list[discord.Embed]]:
+    """
+    Turn a poll's listings into the embeds for each message to send.
+
+    Up to ``summary_threshold`` listings get a full embed each, packed up to 10
+    per message. Above that they are collapsed into summary embeds.
+    """
+    if len(listings) > summary_threshold:
+        logger.debug(f"{len(listings)} listings for {search_name} exceed threshold {summary_threshold}, summarising")
+        embeds = summary_embeds(listings, search_name)
+    else:
+        embeds = [listing_embed(listing) for listing in listings]
+    batches = pack_embeds(embeds)
+    logger.debug(f"Packed {len(embeds)} embeds for {search_name} into {len(batches)} messages")
+    return batches
@@ -1,30 +1,47 @@
+import asyncio
 import base64
 import json
 import logging
 import os
+import time
 import dotenv
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from typing import NamedTuple
 
-import requests
+import aiohttp
+
+import httpclient
+from httpclient import Policy
+from seen import SeenIndex
 
-# Configure logging to file only
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs.log', encoding='utf-8', mode='a')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 dotenv.load_dotenv()
 EBAY_CLIENT_SECRET = os.getenv("EBAY_CLIENT_SECRET")
 EBAY_CLIENT_ID = os.getenv("EBAY_CLIENT_ID")
-
-TRACKER_FILE = Path(__file__).parent / "ebay_last_seen.json"
-OAUTH_URL = "https://api.ebay.com/identity/v1/oauth2/token"
-BROWSE_API_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+EBAY_PERSIST_TOKEN = os.getenv("EBAY_PERSIST_TOKEN", "1") == "1"
+EBAY_MAX_CONCURRENCY = int(os.getenv("EBAY_MAX_CONCURRENCY", 5))
+EBAY_SEEN_MAX_ITEMS = int(os.getenv("EBAY_SEEN_MAX_ITEMS", 5000))
+EBAY_SEEN_MAX_AGE_DAYS = float(os.getenv("EBAY_SEEN_MAX_AGE_DAYS", 30))
+EBAY_CATCH_UP_MAX_ITEMS = int(os.getenv("EBAY_CATCH_UP_MAX_ITEMS", 500))
+EBAY_PREFETCH_PAGES = int(os.getenv("EBAY_PREFETCH_PAGES", 4))
+
+TRACKER_FILE = Path(__file__).parent / "ebay_last_seen.json"  # legacy, migrated into SEEN_DB_FILE
+SEEN_DB_FILE = Path(os.getenv("EBAY_SEEN_DB_FILE", Path(__file__).parent / "ebay_seen.sqlite3"))
+SEARCHES_FILE = Path(os.getenv("EBAY_SEARCHES_FILE", Path(__file__).parent / "ebay_searches.json"))
+TOKEN_FILE = Path(__file__).parent / "ebay_token.json"
+TOKEN_REFRESH_MARGIN = 300  # refresh this many seconds before eBay says the token expires
+# Overridable so the bot can be pointed at eBay's sandbox or the local stubs in bench/
+EBAY_API_URL = os.getenv("EBAY_API_URL", "https://api.ebay.com")
+OAUTH_URL = f"{EBAY_API_URL}/identity/v1/oauth2/token"
+BROWSE_API_URL = f"{EBAY_API_URL}/buy/browse/v1/item_summary/search"
+httpclient.register_host(EBAY_API_URL)
+BROWSE_MAX_OFFSET = 10000  # the Browse API rejects offset + limit beyond this
+# A token request is safe to repeat, and search pages are plain GETs
+OAUTH_POLICY = Policy(total=10, retries=2)
+SEARCH_POLICY = Policy(total=15, retries=2)
 
 
 class EbayError(Exception):
@@ -42,7 +59,110 @@ class EbayAPIError(EbayError):
     pass
 
 
-def get_oauth_token() -> str:
+@dataclass
+class SavedSearch:
+    """
+    One Browse API query watched by the bot.
+
+    Each search has its own last-seen state (keyed by ``name``) and may post to
+    its own Discord channel; ``channel_id=None`` means the bot's default channel.
+    ``limit`` is the page size and ``max_items`` caps how far a catch-up fetch
+    pages back after a burst or downtime.
+    """
+    name: str
+    marketplace: str = "EBAY_GB"
+    keywords: str | None = None
+    category_ids: str | None = None
+    condition_ids: list[str] = field(default_factory=list)
+    min_price: float | None = None
+    max_price: float | None = None
+    currency: str | None = None
+    channel_id: int | None = None
+    limit: int = 50
+    max_items: int = EBAY_CATCH_UP_MAX_ITEMS
+
+    def params(self) -> dict:
+        filters = []
+        if self.condition_ids:
+            filters.append(f"conditionIds:{{{'|'.join(self.condition_ids)}}}")
+        if self.min_price is not None or self.max_price is not None:
+            low = "" if self.min_price is None else self.min_price
+            high = "" if self.max_price is None else self.max_price
+            filters.append(f"price:[{low}..{high}]")
+            if self.currency:
+                filters.append(f"priceCurrency:{self.currency}")
+
+        params = {"sort": "newlyListed", "limit": self.limit}
+        if self.keywords:
+            params["q"] = self.keywords
+        if self.category_ids:
+            params["category_ids"] = self.category_ids
+        if filters:
+            params["filter"] = ",".join(filters)
+        return params
+
+
+class SearchResult(NamedTuple):
+    search: SavedSearch
+    listings: list[dict]
+    error: EbayError | None = None
+
+
+# Using category_ids=179 (Desktop & All-In-One PCs)
+# Note: bn_1635224 from the URL is a browse node, not a category_id
+# The Browse API uses different category IDs than the website browse nodes
+# Category 179 = Desktop & All-In-One PCs (parent category)
+# We're searching for Brand New (condition 7000) items sorted by newly listed
+DEFAULT_SEARCH = SavedSearch(name="default", category_ids="179", condition_ids=["7000"])
+
+
+def load_searches() -> list[SavedSearch]:
+    """
+    Load the saved searches from ``SEARCHES_FILE``.
+
+    The file holds a JSON list of objects using the ``SavedSearch`` field names.
+    Falls back to ``DEFAULT_SEARCH`` if the file is missing or invalid.
+    """
+    if not SEARCHES_FILE.exists():
+        logger.debug(f"No searches file at {SEARCHES_FILE}, using default search")
+        return [DEFAULT_SEARCH]
+    try:
+        with open(SEARCHES_FILE, "r") as f:
+            searches = [SavedSearch(**entry) for entry in json.load(f)]
+    except (json.JSONDecodeError, IOError, TypeError) as e:
+        logger.error(f"Failed to load searches file, using default search: {e}")
+        return [DEFAULT_SEARCH]
+
+    names = [search.name for search in searches]
+    if len(set(names)) != len(names):
+        logger.error("Saved search names must be unique, using default search")
+        return [DEFAULT_SEARCH]
+    logger.info(f"Loaded {len(searches)} saved searches: {names}")
+    return searches
+
+
+def _run_sync(coro):
+    """Run an eBay coroutine from synchronous code, closing the session afterwards."""
+
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await httpclient.close_session()
+
+    return asyncio.run(runner())
+
+
+async def request_oauth_token_async() -> dict:
+    """
+    Request a new application token from eBay.
+
+    Returns:
+        dict: The OAuth response, including ``access_token`` and ``expires_in`` (seconds)
+
+    Raises:
+        EbayAuthError: Authentication issues
+    """
     logger.info("Starting OAuth token request")
     credentials = f"{EBAY_CLIENT_ID}:{EBAY_CLIENT_SECRET}"
     encoded_credentials = base64.b64encode(credentials.encode()).decode()
@@ -50,7 +170,7 @@ def get_oauth_token() -> str:
 
     try:
         logger.debug(f"Sending OAuth request to {OAUTH_URL}")
-        response = requests.post(
+        async with httpclient.post(
             OAUTH_URL,
             headers={
                 "Content-Type": "application/x-www-form-urlencoded",
@@ -60,158 +180,242 @@ def get_oauth_token() -> str:
                 "grant_type": "client_credentials",
                 "scope": "https://api.ebay.com/oauth/api_scope"
             },
-            timeout=10
-        )
-        logger.debug(f"OAuth response status code: {response.status_code}")
-    except requests.Timeout:
+            policy=OAUTH_POLICY,
+            idempotent=True
+        ) as response:
+            logger.debug(f"OAuth response status code: {response.status}")
+            if response.status == 401:
+                logger.error("OAuth authentication failed: Invalid credentials")
+                raise EbayAuthError("Invalid credentials")
+            if response.status != 200:
+                logger.error(f"OAuth authentication failed with status code {response.status}")
+                raise EbayAuthError(f"Auth failed (HTTP {response.status})")
+            data = await response.json()
+    except asyncio.TimeoutError:
         logger.error("OAuth authentication timed out")
         raise EbayAuthError("Authentication timed out")
-    except requests.RequestException as e:
+    except aiohttp.ClientError as e:
         logger.error(f"OAuth request exception: {e}")
         raise EbayAuthError(f"Authentication request failed: {e}")
 
-    if response.status_code == 401:
-        logger.error("OAuth authentication failed: Invalid credentials")
-        raise EbayAuthError("Invalid credentials")
-    if response.status_code != 200:
-        logger.error(f"OAuth authentication failed with status code {response.status_code}")
-        raise EbayAuthError(f"Auth failed (HTTP {response.status_code})")
+    logger.info(f"OAuth token acquired successfully (expires in {data.get('expires_in')}s)")
+    return data
+
 
-    token = response.json()["access_token"]
-    logger.info("OAuth token acquired successfully")
-    return token
+async def get_oauth_token_async() -> str:
+    return (await request_oauth_token_async())["access_token"]
 
 
-def load_last_seen() -> dict | None:
-    logger.debug(f"Loading last seen data from {TRACKER_FILE}")
+def request_oauth_token() -> dict:
+    return _run_sync(request_oauth_token_async())
+
+
+def get_oauth_token() -> str:
+    return _run_sync(get_oauth_token_async())
+
+
+class TokenManager:
+    """
+    Keeps an eBay application token and refreshes it shortly before it expires.
+
+    eBay tokens last about two hours, so one token covers many polls. When
+    ``token_file`` is set the token is also persisted there, so a restart can
+    reuse it instead of authenticating again. The token is shared by every
+    coroutine using this manager; only one refresh runs at a time.
+    """
+
+    def __init__(self, token_file: Path | None = None, refresh_margin: int = TOKEN_REFRESH_MARGIN):
+        self.token_file = token_file
+        self.refresh_margin = refresh_margin
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._load()
+
+    @property
+    def expires_at(self) -> float:
+        return self._expires_at
+
+    def is_valid(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - self.refresh_margin
+
+    async def get_token(self) -> str:
+        if self.is_valid():
+            logger.debug(f"Using cached OAuth token ({self._expires_at - time.time():.0f}s left)")
+            return self._token
+        # Concurrent callers wait for the one refresh in flight instead of each authenticating
+        async with self._lock:
+            if not self.is_valid():
+                logger.debug("No valid cached token, refreshing")
+                await self._refresh()
+            return self._token
+
+    async def _refresh(self) -> None:
+        data = await request_oauth_token_async()
+        self._token = data["access_token"]
+        self._expires_at = time.time() + int(data.get("expires_in", 0))
+        await asyncio.to_thread(self._save)
+
+    def invalidate(self, token: str | None = None) -> None:
+        """Drop the cached token. If ``token`` is given, only drop it if it is still the current one."""
+        if token is not None and token != self._token:
+            return
+        logger.info("Invalidating cached OAuth token")
+        self._token = None
+        self._expires_at = 0.0
+        if self.token_file and self.token_file.exists():
+            try:
+                self.token_file.unlink()
+            except OSError as e:
+                logger.warning(f"Failed to remove token file: {e}")
+
+    def _load(self) -> None:
+        if not self.token_file or not self.token_file.exists():
+            return
+        try:
+            with open(self.token_file, "r") as f:
+                data = json.load(f)
+            self._token = data["access_token"]
+            self._expires_at = float(data["expires_at"])
+            logger.info(f"Loaded cached OAuth token from {self.token_file}")
+        except (json.JSONDecodeError, IOError, KeyError, ValueError) as e:
+            logger.warning(f"Failed to load token file: {e}")
+            self._token = None
+            self._expires_at = 0.0
+
+    def _save(self) -> None:
+        if not self.token_file:
+            return
+        try:
+            fd = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"access_token": self._token, "expires_at": self._expires_at}, f)
+            logger.debug(f"Saved OAuth token to {self.token_file}")
+        except IOError as e:
+            logger.error(f"Failed to save token file: {e}")
+
+
+token_manager = TokenManager(TOKEN_FILE if EBAY_PERSIST_TOKEN else None)
+seen_index = SeenIndex(SEEN_DB_FILE, max_items=EBAY_SEEN_MAX_ITEMS, max_age=EBAY_SEEN_MAX_AGE_DAYS * 86400)
+
+
+def load_legacy_cutoffs() -> dict[str, datetime]:
+    """
+    Read the creation date of each search's last-seen item from the old JSON tracker file.
+
+    Used once after upgrading, so the first poll of each search doesn't repost
+    everything before the seen index has been populated.
+    """
     if not TRACKER_FILE.exists():
-        logger.info("Tracker file does not exist, returning None")
-        return None
+        return {}
     try:
         with open(TRACKER_FILE, "r") as f:
             data = json.load(f)
-            logger.info(f"Loaded last seen item: {data.get('item_id', 'Unknown')}")
-            return data
-    except (json.JSONDecodeError, IOError) as e:
-        logger.warning(f"Failed to load tracker file: {e}")
-        return None
-
-
-def save_last_seen(item: dict) -> None:
-    item_id = item.get("itemId")
-    logger.debug(f"Saving last seen item: {item_id}")
-    try:
-        data = {
-            "item_id": item_id,
-            "item_creation_date": item.get("itemCreationDate"),
-            "title": item.get("title"),
-            "saved_at": datetime.now().isoformat()
-        }
-        with open(TRACKER_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Successfully saved last seen item: {item_id}")
-    except IOError as e:
-        logger.error(f"Failed to save tracker file: {e}")
+        if "item_id" in data:
+            # Single-search tracker file from before saved searches existed
+            data = {DEFAULT_SEARCH.name: data}
+        cutoffs = {name: parse_ebay_date(entry["item_creation_date"]) for name, entry in data.items()}
+    except (json.JSONDecodeError, IOError, KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable legacy tracker file: {e}")
+        return {}
+    logger.info(f"Loaded legacy last seen dates for {len(cutoffs)} searches from {TRACKER_FILE}")
+    return cutoffs
 
 
 def parse_ebay_date(date_str: str) -> datetime:
     return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
 
 
-def filter_new_listings(items: list, last_seen: dict | None) -> list:
-    logger.debug(f"Filtering new listings from {len(items)} total items")
-    if not last_seen:
-        logger.info("No last seen data, returning all items")
-        return items
-
-    try:
-        last_seen_date = parse_ebay_date(last_seen["item_creation_date"])
-        last_seen_id = last_seen["item_id"]
-        logger.debug(f"Last seen: ID={last_seen_id}, Date={last_seen_date}")
-    except (KeyError, ValueError) as e:
-        logger.warning(f"Invalid tracker data, returning all items: {e}")
-        return items
+_legacy_cutoffs = load_legacy_cutoffs()
 
-    new_items = []
-    found_last_seen = False
 
-    for idx, item in enumerate(items):
-        try:
-            item_date = parse_ebay_date(item.get("itemCreationDate", ""))
-            item_id = item.get("itemId")
+def filter_new_listings(items: list, seen: SeenIndex, search_name: str) -> list:
+    """
+    Return the items not yet in ``seen`` for this search, and mark every item as seen.
 
-            logger.debug(f"Item {idx}: ID={item_id}, Date={item_date}")
+    Result order doesn't matter, so reordered, deleted or same-second listings
+    are neither missed nor posted twice.
+    """
+    logger.debug(f"Filtering new listings from {len(items)} total items for search {search_name}")
 
-            if item_id == last_seen_id:
-                logger.debug(f"Found last seen item at position {idx}: {item_id}")
-                found_last_seen = True
-                break
-            if item_date > last_seen_date:
-                new_items.append(item)
-                logger.debug(f"New item {idx}: {item_id} - {item.get('title', 'No title')[:50]}")
-            else:
-                logger.debug(f"Item {idx} ({item_id}) is older than last seen date, stopping filter")
-                break
-        except ValueError as e:
-            logger.warning(f"Skipping item {idx} with invalid date: {item.get('itemId')} - {e}")
+    legacy_cutoff = _legacy_cutoffs.get(search_name) if seen.is_empty(search_name) else None
+    new_items = []
+    for item in items:
+        item_id = item.get("itemId")
+        if not item_id or seen.contains(search_name, item_id):
             continue
-
-    if not found_last_seen and new_items:
-        logger.warning(f"Last seen item {last_seen_id} not found in results. This may indicate the search results don't match the expected category.")
-
-    logger.info(f"Filtered {len(new_items)} new listings (found_last_seen={found_last_seen})")
+        if legacy_cutoff is not None:
+            try:
+                if parse_ebay_date(item.get("itemCreationDate", "")) <= legacy_cutoff:
+                    continue
+            except ValueError:
+                pass
+        new_items.append(item)
+
+    for item in reversed(items):
+        # Oldest first, so the newest listings are the last to be evicted
+        if item.get("itemId"):
+            seen.add(search_name, item["itemId"])
+
+    logger.info(f"Filtered {len(new_items)} new listings for search {search_name}")
     return new_items
 
 
-def search_ebay(access_token: str, marketplace: str = "EBAY_GB", limit: int = 50) -> list:
-    logger.info(f"Searching eBay: marketplace={marketplace}, limit={limit}")
+async def search_ebay_page_async(access_token: str, search: SavedSearch = DEFAULT_SEARCH, offset: int = 0) -> dict:
+    """
+    Fetch one page of search results.
+
+    Returns:
+        dict: The Browse API response (``itemSummaries``, ``total``, ``next``, ...)
 
-    # Using category_ids=179 (Desktop & All-In-One PCs)
-    # Note: bn_1635224 from the URL is a browse node, not a category_id
-    # The Browse API uses different category IDs than the website browse nodes
-    # Category 179 = Desktop & All-In-One PCs (parent category)
-    # We're searching for Brand New (condition 7000) items sorted by newly listed
-    params = {
-        "category_ids": "179",  # Using parent category as Browse API may not accept browse nodes
-        "filter": "conditionIds:{7000}",
-        "sort": "newlyListed",
-        "limit": limit
-    }
+    Raises:
+        EbayAuthError: The token was rejected
+        EbayAPIError: API request issues
+    """
+    logger.info(f"Searching eBay: search={search.name}, marketplace={search.marketplace}, "
+                f"limit={search.limit}, offset={offset}")
 
+    params = search.params()
+    if offset:
+        params["offset"] = offset
     logger.debug(f"Search parameters: {params}")
 
     try:
         logger.debug(f"Sending search request to {BROWSE_API_URL}")
-        response = requests.get(
+        async with httpclient.get(
             BROWSE_API_URL,
             headers={
                 "Authorization": f"Bearer {access_token}",
-                "X-EBAY-C-MARKETPLACE-ID": marketplace,
+                "X-EBAY-C-MARKETPLACE-ID": search.marketplace,
                 "Content-Type": "application/json"
             },
             params=params,
-            timeout=15
-        )
-        logger.debug(f"Search response status code: {response.status_code}")
-        logger.debug(f"Response URL: {response.url}")
-    except requests.Timeout:
+            policy=SEARCH_POLICY
+        ) as response:
+            logger.debug(f"Search response status code: {response.status}")
+            logger.debug(f"Response URL: {response.url}")
+            if response.status == 401:
+                logger.error("eBay search failed: Token expired or invalid")
+                raise EbayAuthError("Token expired or invalid")
+            if response.status != 200:
+                error_body = await response.text()
+                logger.error(f"eBay search failed with status code {response.status}")
+                logger.error(f"Error response body: {error_body}")
+                raise EbayAPIError(f"Search failed (HTTP {response.status}): {error_body}")
+            data = await response.json()
+    except asyncio.TimeoutError:
         logger.error("eBay search request timed out")
         raise EbayAPIError("Search request timed out")
-    except requests.RequestException as e:
+    except aiohttp.ClientError as e:
         logger.error(f"eBay search request exception: {e}")
         raise EbayAPIError(f"Search request failed: {e}")
 
-    if response.status_code == 401:
-        logger.error("eBay search failed: Token expired or invalid")
-        raise EbayAuthError("Token expired or invalid")
-    if response.status_code != 200:
-        error_body = response.text
-        logger.error(f"eBay search failed with status code {response.status_code}")
-        logger.error(f"Error response body: {error_body}")
-        raise EbayAPIError(f"Search failed (HTTP {response.status_code}): {error_body}")
+    return data
+
 
-    items = response.json().get("itemSummaries", [])
-    logger.info(f"Search returned {len(items)} items")
+async def search_ebay_async(access_token: str, search: SavedSearch = DEFAULT_SEARCH) -> list:
+    items = (await search_ebay_page_async(access_token, search)).get("itemSummaries", [])
+    logger.info(f"Search {search.name} returned {len(items)} items")
 
     # Log first few items for debugging
     if items:
@@ -224,6 +428,61 @@ def search_ebay(access_token: str, marketplace: str = "EBAY_GB", limit: int = 50
     return items
 
 
+def search_ebay(access_token: str, search: SavedSearch = DEFAULT_SEARCH) -> list:
+    return _run_sync(search_ebay_async(access_token, search))
+
+
+async def search_ebay_catch_up_async(access_token: str, search: SavedSearch, seen: SeenIndex) -> list:
+    """
+    Fetch newest-first results until reaching items already in ``seen`` or ``search.max_items``.
+
+    The first page tells us the total, after which the following pages are
+    requested ``EBAY_PREFETCH_PAGES`` at a time concurrently. A search with no
+    seen state yet only fetches its first page.
+
+    Returns:
+        list: Items in result order, without duplicates from results shifting between pages
+    """
+    first_page = await search_ebay_page_async(access_token, search)
+    items = first_page.get("itemSummaries", [])
+    total = first_page.get("total", len(items))
+
+    def reached_seen(page_items: list) -> bool:
+        return any(seen.contains(search.name, item.get("itemId")) for item in page_items)
+
+    if seen.is_empty(search.name) or reached_seen(items) or not first_page.get("next"):
+        logger.info(f"Search {search.name} returned {len(items)} items")
+        return items[:search.max_items]
+
+    end = min(total, search.max_items, BROWSE_MAX_OFFSET - search.limit)
+    offsets = list(range(search.limit, end, search.limit))
+    logger.info(f"Search {search.name}: first page is all new, catching up over {len(offsets)} more pages "
+                f"(total={total}, cap={search.max_items})")
+
+    item_ids = {item.get("itemId") for item in items}
+    for start in range(0, len(offsets), EBAY_PREFETCH_PAGES):
+        window = offsets[start:start + EBAY_PREFETCH_PAGES]
+        pages = await asyncio.gather(*(search_ebay_page_async(access_token, search, offset) for offset in window))
+
+        done = False
+        for page in pages:
+            page_items = page.get("itemSummaries", [])
+            for item in page_items:
+                if item.get("itemId") not in item_ids:
+                    item_ids.add(item.get("itemId"))
+                    items.append(item)
+            if reached_seen(page_items) or not page.get("next"):
+                done = True
+                break
+        if done:
+            break
+
+    # The cap is only checked between pages, so the last page can overshoot it
+    items = items[:search.max_items]
+    logger.info(f"Search {search.name} returned {len(items)} items after catch-up")
+    return items
+
+
 def format_listing(item: dict) -> dict:
     item_id = item.get("itemId")
     logger.debug(f"Formatting listing: {item_id}")
@@ -239,6 +498,9 @@ def format_listing(item: dict) -> dict:
             "min_date": shipping[0].get("minEstimatedDeliveryDate", "").split("T")[0] or None,
             "max_date": shipping[0].get("maxEstimatedDeliveryDate", "").split("T")[0] or None
         }
+        delivery["text"] = delivery["cost"]
+        if delivery["min_date"] and delivery["max_date"]:
+            delivery["text"] += f" ({delivery['min_date']} - {delivery['max_date']})"
         logger.debug(f"Delivery info: {delivery}")
 
     formatted = {
@@ -252,9 +514,76 @@ def format_listing(item: dict) -> dict:
     return formatted
 
 
-def get_new_listings(marketplace: str = "EBAY_GB") -> list[dict]:
+async def _search_with_token(search: SavedSearch) -> list:
+    token = await token_manager.get_token()
+    try:
+        return await search_ebay_catch_up_async(token, search, seen_index)
+    except EbayAuthError:
+        logger.warning(f"Search {search.name} rejected the OAuth token, retrying once with a fresh one")
+        token_manager.invalidate(token)
+        return await search_ebay_catch_up_async(await token_manager.get_token(), search, seen_index)
+
+
+async def get_new_listings_for_searches(searches: list[SavedSearch],
+                                        max_concurrency: int = EBAY_MAX_CONCURRENCY) -> list[SearchResult]:
     """
-    Fetch new eBay listings.
+    Run several saved searches concurrently and collect their new listings.
+
+    All searches share one OAuth token and the pooled HTTP session. At most
+    ``max_concurrency`` searches run at once, and a search catching up has up
+    to ``EBAY_PREFETCH_PAGES`` page requests in flight, so up to
+    ``max_concurrency * EBAY_PREFETCH_PAGES`` requests can be in flight in
+    total. A failing search is reported in its ``SearchResult.error`` and
+    does not affect the others.
+
+    Returns:
+        list[SearchResult]: One result per search, in the order given
+
+    Raises:
+        EbayAuthError: The OAuth token could not be obtained
+    """
+    logger.info(f"Checking {len(searches)} saved searches (max concurrency {max_concurrency})")
+
+    # Fetch the shared token up front so the searches don't queue on the refresh lock one by one
+    await token_manager.get_token()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(search: SavedSearch) -> SearchResult:
+        async with semaphore:
+            try:
+                items = await _search_with_token(search)
+            except EbayError as e:
+                logger.error(f"Search {search.name} failed: {e}")
+                return SearchResult(search, [], e)
+
+        if not items:
+            logger.info(f"No items returned from search {search.name}")
+            return SearchResult(search, [])
+
+        new_items = filter_new_listings(items, seen_index, search.name)
+        return SearchResult(search, [format_listing(item) for item in new_items])
+
+    results = await asyncio.gather(*(run(search) for search in searches))
+    await seen_index.commit_async()
+    # A search that failed or returned nothing still needs its legacy cutoff on the next poll
+    unmigrated = [name for name in _legacy_cutoffs if seen_index.is_empty(name)]
+    if unmigrated:
+        logger.info(f"Keeping legacy tracker file until these searches are seeded: {', '.join(unmigrated)}")
+    elif _legacy_cutoffs and TRACKER_FILE.exists():
+        logger.info(f"Seen index populated, retiring legacy tracker file {TRACKER_FILE}")
+        try:
+            TRACKER_FILE.rename(TRACKER_FILE.with_suffix(".json.migrated"))
+        except OSError as e:
+            # The listings are already committed as seen, so they must still be returned
+            logger.warning(f"Could not retire legacy tracker file {TRACKER_FILE}: {e}")
+
+    logger.info(f"Returning {sum(len(r.listings) for r in results)} new listings from {len(results)} searches")
+    return list(results)
+
+
+async def get_new_listings_async(search: SavedSearch = DEFAULT_SEARCH) -> list[dict]:
+    """
+    Fetch new eBay listings for one saved search without blocking the event loop.
 
     Returns:
         list[dict]: List of new listings
@@ -263,19 +592,23 @@ def get_new_listings(marketplace: str = "EBAY_GB") -> list[dict]:
         EbayAuthError: Authentication issues
         EbayAPIError: API request issues
     """
-    logger.info(f"Starting get_new_listings for marketplace: {marketplace}")
+    logger.info(f"Starting get_new_listings for search: {search.name}")
+
+    result, = await get_new_listings_for_searches([search])
+    if result.error:
+        raise result.error
+    return result.listings
 
-    token = get_oauth_token()
-    last_seen = load_last_seen()
 
-    all_items = search_ebay(token, marketplace)
-    if not all_items:
-        logger.info("No items returned from search")
-        return []
+def get_new_listings(search: SavedSearch = DEFAULT_SEARCH) -> list[dict]:
+    """
+    Fetch new eBay listings. Blocking wrapper around ``get_new_listings_async`` for scripts.
 
-    new_items = filter_new_listings(all_items, last_seen)
-    save_last_seen(all_items[0])
+    Returns:
+        list[dict]: List of new listings
 
-    formatted_listings = [format_listing(item) for item in new_items]
-    logger.info(f"Returning {len(formatted_listings)} new listings")
-    return formatted_listings
+    Raises:
+        EbayAuthError: Authentication issues
+        EbayAPIError: API request issues
+    """
+    return _run_sync(get_new_listings_async(search))
@@ -0,0 +1,241 @@
+"""
+Shared HTTP client for every upstream the bot talks to.
+
+One aiohttp session with a pooled, keep-alive connector serves all modules,
+so connections and TLS sessions to each host are reused between calls.
+aiohttp keys its pool by host, so ``HTTP_POOL_PER_HOST`` caps each upstream
+separately while ``HTTP_POOL_SIZE`` caps the total. aiohttp only speaks
+HTTP/1.1; with keep-alive that is enough for the few requests per minute
+each upstream sees.
+
+Each call site passes a ``Policy`` with its timeouts and retry rules.
+Idempotent requests that time out, fail to connect, or get a 5xx are
+retried with jittered exponential backoff. Every host has a circuit
+breaker: after ``breaker_failures`` failures in a row, calls fail at once
+with ``CircuitOpenError`` for ``breaker_reset`` seconds, then one trial
+request decides whether it closes again.
+
+Environment:
+    HTTP_POOL_SIZE          connections across all hosts (100)
+    HTTP_POOL_PER_HOST      connections per host (20)
+    HTTP_KEEPALIVE_SECONDS  how long idle connections are kept (60)
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import aiohttp
+import dotenv
+from yarl import URL
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 100))
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", 20))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 60))
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_session: aiohttp.ClientSession | None = None
+_breakers: dict[str, "CircuitBreaker"] = {}
+_known_hosts: set[str] = set()
+
+
+@dataclass(frozen=True)
+class Policy:
+    """Timeouts, retries and circuit breaking for one upstream."""
+    total: float = 30.0  # seconds for one attempt, including reading the body
+    connect: float = 5.0
+    sock_read: float | None = None
+    retries: int = 2  # attempts after the first
+    backoff: float = 0.5  # first retry waits up to this long, doubling each time
+    max_backoff: float = 10.0
+    retry_statuses: frozenset[int] = frozenset({500, 502, 503, 504})
+    breaker_failures: int = 5
+    breaker_reset: float = 30.0
+
+    @property
+    def timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=self.total, connect=self.connect, sock_read=self.sock_read)
+
+    def delay(self, attempt: int) -> float:
+        """Full jitter: a random wait up to the exponential backoff for ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+DEFAULT_POLICY = Policy()
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """The host failed too often recently; the request was not sent."""
+
+    def __init__(self, host: str, retry_in: float):
+        self.host = host
+        self.retry_in = retry_in
+        super().__init__(f"{host} is failing, not retrying for another {retry_in:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one host.
+
+    Closed: requests go through. Open: requests fail immediately until
+    ``reset_after`` seconds have passed. Half open: one trial request is let
+    through every ``reset_after`` seconds, and its outcome closes the circuit
+    or keeps it open. Timing the trials, rather than waiting for the trial's
+    outcome, means a cancelled trial can't leave the circuit stuck open.
+    """
+
+    def __init__(self, host: str, failures: int, reset_after: float):
+        self.host = host
+        self.max_failures = failures
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+    def check(self) -> None:
+        """Raise ``CircuitOpenError`` unless a request may be sent now."""
+        state = self.state
+        if state == "open":
+            raise CircuitOpenError(self.host, self.opened_at + self.reset_after - time.monotonic())
+        if state == "half_open":
+            logger.info(f"Circuit for {self.host} half open, sending a trial request")
+            # Anyone else waits out another period, by when the trial has succeeded or failed
+            self.opened_at = time.monotonic()
+
+    def success(self) -> None:
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.host} closed again")
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.max_failures:
+            if self.opened_at is None:
+                logger.warning(f"Circuit for {self.host} opened after {self.failures} failures")
+                metrics.inc("http_circuit_opened_total", host=self.host)
+            self.opened_at = time.monotonic()
+
+
+def breaker(host: str, policy: Policy = DEFAULT_POLICY) -> CircuitBreaker:
+    found = _breakers.get(host)
+    if found is None:
+        found = _breakers[host] = CircuitBreaker(host, policy.breaker_failures, policy.breaker_reset)
+    return found
+
+
+def register_host(url: str | URL) -> None:
+    """Label this upstream's requests with its host in metrics; any other host is counted as "other"."""
+    _known_hosts.add(URL(url).host)
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        logger.debug(f"Creating HTTP session (pool {HTTP_POOL_SIZE}, {HTTP_POOL_PER_HOST} per host)")
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, limit_per_host=HTTP_POOL_PER_HOST,
+                                           keepalive_timeout=HTTP_KEEPALIVE_SECONDS, ttl_dns_cache=300),
+            trace_configs=[metrics.http_trace_config(_known_hosts)]
+        )
+    return _session
+
+
+async def close_session() -> None:
+    global _session
+    if _session is not None and not _session.closed:
+        logger.debug("Closing HTTP session")
+        await _session.close()
+    _session = None
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> float | None:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+@asynccontextmanager
+async def request(method: str, url: str | URL, *, policy: Policy = DEFAULT_POLICY, idempotent: bool | None = None,
+                  **kwargs):
+    """
+    Send a request through the shared session, as ``async with request(...) as response``.
+
+    Takes the same keyword arguments as ``ClientSession.request``. Retries
+    only cover getting the response; once it is handed over, reading the
+    body is up to the caller, within the policy's timeouts. ``idempotent``
+    allows retrying a request whose method normally isn't, e.g. a token
+    request that is safe to repeat.
+
+    Raises:
+        CircuitOpenError: The host's circuit is open
+        aiohttp.ClientError: The request failed on every attempt
+        asyncio.TimeoutError: The last attempt timed out
+    """
+    method = method.upper()
+    host = URL(url).host or ""
+    circuit = breaker(host, policy)
+    retries = policy.retries if (method in IDEMPOTENT_METHODS if idempotent is None else idempotent) else 0
+    session = await get_session()
+    kwargs.setdefault("timeout", policy.timeout)
+
+    attempt = 0
+    while True:
+        circuit.check()
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            circuit.failure()
+            if attempt >= retries:
+                raise
+            wait = policy.delay(attempt)
+            logger.info(f"{method} {host} failed ({type(e).__name__}: {e}), retrying in {wait:.2f}s")
+        else:
+            if response.status not in policy.retry_statuses:
+                # 4xx are the caller's problem, not a sign the host is down
+                circuit.success()
+                break
+            circuit.failure()
+            if attempt >= retries:
+                break
+            retry_after = _retry_after(response)
+            wait = min(policy.max_backoff, retry_after) if retry_after is not None else policy.delay(attempt)
+            response.release()
+            logger.info(f"{method} {host} returned {response.status}, retrying in {wait:.2f}s")
+        metrics.inc("http_retries_total", host=host)
+        attempt += 1
+        await asyncio.sleep(wait)
+
+    try:
+        yield response
+    finally:
+        response.release()
+
+
+def get(url: str | URL, *, policy: Policy = DEFAULT_POLICY, **kwargs):
+    return request("GET", url, policy=policy, **kwargs)
+
+
+def post(url: str | URL, *, policy: Policy = DEFAULT_POLICY, **kwargs):
+    return request("POST", url, policy=policy, **kwargs)
+
+
+def stats() -> dict:
+    """Circuit state per host, for /stats and the metrics endpoint."""
+    return {host: {"state": circuit.state, "failures": circuit.failures} for host, circuit in _breakers.items()}
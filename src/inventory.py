@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from contextlib import aclosing, closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, NamedTuple
+
+import nmap as nm
+from scanner import get_backend
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    address TEXT PRIMARY KEY,
+    mac TEXT,
+    vendor TEXT,
+    hostname TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    up INTEGER NOT NULL,
+    ports_scanned_at REAL
+);
+CREATE TABLE IF NOT EXISTS ports (
+    address TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    protocol TEXT NOT NULL,
+    service TEXT,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (address, port, protocol)
+);
+CREATE TABLE IF NOT EXISTS changes (
+    at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    address TEXT NOT NULL,
+    detail TEXT
+);
+"""
+MAX_CHANGES = 500
+
+
+class Change(NamedTuple):
+    at: float
+    kind: str  # "new host", "host gone", "host back", "mac changed", "port opened", "port closed"
+    address: str
+    detail: str | None = None
+
+    def __str__(self) -> str:
+        return f"{self.address}: {self.kind}" + (f" ({self.detail})" if self.detail else "")
+
+
+@dataclass
+class InventoryHost:
+    address: str
+    first_seen: float
+    last_seen: float
+    up: bool = True
+    mac: str | None = None
+    vendor: str | None = None
+    hostname: str | None = None
+    ports_scanned_at: float | None = None
+    ports: dict[str, nm.Port] = field(default_factory=dict)  # keyed by "22/tcp"
+    latency: float | None = None  # from the latest discovery, not persisted
+    needs_ports: bool = False  # came back or changed MAC, so rescan regardless of age; not persisted
+
+    @property
+    def open_ports(self) -> list[nm.Port]:
+        return sorted(self.ports.values(), key=lambda port: (port.protocol, port.port))
+
+
+class Inventory:
+    """
+    Persistent record of the hosts and open ports seen on the local network.
+
+    The whole inventory is held in memory so commands can answer from it
+    straight away, and is written to SQLite after each refresh. ``refresh``
+    compares a new scan with what is stored and records what changed.
+    Scans go through ``backend`` (see ``scanner.get_backend``).
+    """
+
+    def __init__(self, path: Path, backend: ModuleType | None = None):
+        self.path = path
+        self.backend = backend or get_backend()
+        self.hosts: dict[str, InventoryHost] = {}
+        self.changes: list[Change] = []
+        self.refreshed_at: float | None = None
+        self.last_changes: list[Change] = []
+        self._lock = asyncio.Lock()
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _load(self) -> None:
+        try:
+            with closing(self._connect()) as conn:
+                for address, mac, vendor, hostname, first_seen, last_seen, up, scanned_at in conn.execute(
+                        "SELECT address, mac, vendor, hostname, first_seen, last_seen, up, ports_scanned_at FROM hosts"):
+                    self.hosts[address] = InventoryHost(address, first_seen, last_seen, bool(up), mac, vendor,
+                                                        hostname, scanned_at)
+                for address, port, protocol, service in conn.execute(
+                        "SELECT address, port, protocol, service FROM ports"):
+                    if address in self.hosts:
+                        record = nm.Port(port, protocol, "open", service)
+                        self.hosts[address].ports[str(record)] = record
+                self.changes = [Change(*row) for row in conn.execute(
+                    "SELECT at, kind, address, detail FROM changes ORDER BY at DESC LIMIT ?", (MAX_CHANGES,))][::-1]
+        except sqlite3.Error as e:
+            logger.error(f"Failed to load inventory from {self.path}: {e}")
+            return
+        logger.info(f"Loaded inventory with {len(self.hosts)} hosts from {self.path}")
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.hosts
+
+    def live_hosts(self) -> list[InventoryHost]:
+        return sorted((host for host in self.hosts.values() if host.up), key=lambda host: _address_key(host.address))
+
+    def recent_changes(self, since: float) -> list[Change]:
+        return [change for change in self.changes if change.at >= since]
+
+    def apply_discovery(self, found: list[nm.Host], probed: set[str] | None = None, now: float | None = None) -> list[Change]:
+        """
+        Merge a discovery scan into the inventory.
+
+        ``probed`` is the set of addresses the scan covered; known live hosts in
+        it that didn't answer are marked gone. Defaults to every known host.
+        """
+        now = time.time() if now is None else now
+        changes = []
+        answered = set()
+        for host in found:
+            answered.add(host.address)
+            record = self.hosts.get(host.address)
+            if record is None:
+                record = self.hosts[host.address] = InventoryHost(host.address, now, now)
+                changes.append(Change(now, "new host", host.address, host.vendor or host.mac))
+            elif not record.up:
+                record.up = True
+                changes.append(Change(now, "host back", host.address))
+                record.needs_ports = True  # rescan and diff against last time
+            elif host.mac and record.mac and host.mac != record.mac:
+                changes.append(Change(now, "mac changed", host.address, f"{record.mac} -> {host.mac}"))
+                record.needs_ports = True
+
+            record.last_seen = now
+            record.mac = host.mac or record.mac
+            record.vendor = host.vendor or record.vendor
+            record.hostname = host.hostname or record.hostname
+            record.latency = host.latency
+
+        probed = set(self.hosts) if probed is None else probed
+        for address in probed - answered:
+            record = self.hosts.get(address)
+            if record is not None and record.up:
+                record.up = False
+                changes.append(Change(now, "host gone", address))
+        self._record(changes)
+        return changes
+
+    def apply_ports(self, host: nm.Host, now: float | None = None) -> list[Change]:
+        """Merge a port scan of one host into the inventory."""
+        now = time.time() if now is None else now
+        record = self.hosts.get(host.address)
+        if record is None or host.state != "up":
+            return []
+
+        current = {str(port): port for port in host.open_ports}
+        changes = []
+        # A host's first scan isn't a change, just a baseline
+        if record.ports_scanned_at is not None:
+            for key in current.keys() - record.ports.keys():
+                changes.append(Change(now, "port opened", host.address, f"{key} {current[key].service or ''}".strip()))
+            for key in record.ports.keys() - current.keys():
+                changes.append(Change(now, "port closed", host.address, key))
+        record.ports = current
+        record.ports_scanned_at = now
+        record.needs_ports = False
+        self._record(changes)
+        return changes
+
+    def needs_port_scan(self, address: str, max_age: float, now: float | None = None) -> bool:
+        record = self.hosts.get(address)
+        if record is None or not record.up:
+            return False
+        now = time.time() if now is None else now
+        return record.needs_ports or record.ports_scanned_at is None or now - record.ports_scanned_at >= max_age
+
+    def _record(self, changes: list[Change]) -> None:
+        for change in changes:
+            logger.info(f"Inventory change: {change}")
+        self.changes.extend(changes)
+        del self.changes[:-MAX_CHANGES]
+
+    def _write(self, hosts: list[tuple], ports: list[tuple], changes: list[tuple]) -> None:
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO hosts (address, mac, vendor, hostname, first_seen, last_seen, up, "
+                    "ports_scanned_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", hosts)
+                # Upsert rather than replace, so each port keeps the time it was first seen open
+                stored = set(conn.execute("SELECT address, port, protocol FROM ports"))
+                current = {port[:3] for port in ports}
+                conn.executemany("DELETE FROM ports WHERE address = ? AND port = ? AND protocol = ?",
+                                 stored - current)
+                conn.executemany(
+                    "INSERT INTO ports (address, port, protocol, service, first_seen) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (address, port, protocol) DO UPDATE SET service = excluded.service", ports)
+                conn.executemany("INSERT INTO changes (at, kind, address, detail) VALUES (?, ?, ?, ?)", changes)
+                conn.execute("DELETE FROM changes WHERE rowid NOT IN "
+                             "(SELECT rowid FROM changes ORDER BY at DESC LIMIT ?)", (MAX_CHANGES,))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save inventory to {self.path}: {e}")
+
+    async def save(self, new_changes: list[Change]) -> None:
+        """Write the inventory to SQLite in one transaction, from a worker thread."""
+        hosts = [(h.address, h.mac, h.vendor, h.hostname, h.first_seen, h.last_seen, int(h.up), h.ports_scanned_at)
+                 for h in self.hosts.values()]
+        ports = [(h.address, p.port, p.protocol, p.service, h.ports_scanned_at or h.last_seen)
+                 for h in self.hosts.values() for p in h.ports.values()]
+        await asyncio.to_thread(self._write, hosts, ports, [tuple(change) for change in new_changes])
+
+    async def refresh(self, networks: list[str], port_rescan_age: float = 6 * 3600,
+                      on_ports: Callable[[InventoryHost], None] | None = None) -> list[Change]:
+        """
+        Rescan the network and return what changed.
+
+        Known live hosts are probed first, then the rest of the ranges are swept
+        for new ones. Ports are only rescanned on hosts that are new, came back,
+        changed MAC or haven't been port scanned for ``port_rescan_age`` seconds.
+        ``on_ports`` is called with each host as soon as its port scan is merged.
+        Concurrent calls share the refresh already running.
+
+        Raises:
+            RuntimeError: If the scan backend fails
+        """
+        if self._lock.locked():
+            # Someone else is already refreshing; wait for it and report its changes
+            async with self._lock:
+                return self.last_changes
+
+        async with self._lock:
+            changes = []
+            known = [host.address for host in self.live_hosts()]
+            if known:
+                found = await self.backend.discover_hosts_async(known)
+                changes += self.apply_discovery(found, probed=set(known))
+            found = await self.backend.discover_hosts_async(networks, exclude=known)
+            changes += self.apply_discovery(found, probed=set())
+
+            to_scan = [address for address in self.hosts if self.needs_port_scan(address, port_rescan_age)]
+            if to_scan:
+                logger.info(f"Port scanning {len(to_scan)} new or changed hosts")
+                async with aclosing(self.backend.scan_ports_async(to_scan)) as results:
+                    async for host in results:
+                        changes += self.apply_ports(host)
+                        if on_ports and host.address in self.hosts:
+                            on_ports(self.hosts[host.address])
+
+            self.refreshed_at = time.time()
+            self.last_changes = changes
+            await self.save(changes)
+            logger.info(f"Inventory refresh found {len(changes)} changes, {len(self.live_hosts())} hosts up")
+            return changes
+
+
+def _address_key(address: str) -> tuple:
+    return tuple(int(part) if part.isdigit() else part for part in address.split("."))
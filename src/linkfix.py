@@ -0,0 +1,135 @@
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Click and campaign identifiers that mean nothing to any site's content, removed from every URL.
+# Names that are only tracking on some sites (si, feature, ...) belong in that site's rule instead.
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl",
+                   "yclid", "twclid", "ttclid"}
+TRACKING_PREFIXES = ("utm_",)
+MOBILE_PREFIXES = ("www.", "m.", "mobile.")
+# Characters that usually end a sentence rather than a URL
+TRAILING_PUNCTUATION = ".,!?:;'\")"
+
+
+class Rule:
+    """
+    One site whose links are rewritten.
+
+    Links to ``domains`` (and their subdomains), or to any host if there are
+    none, have the domain replaced by ``fix_domain``, if set, and lose the
+    tracking parameters plus ``params``.
+    """
+    __slots__ = ("name", "domains", "fix_domain", "params", "hits", "seconds")
+
+    def __init__(self, name: str, domains: list[str], fix_domain: str | None = None, params: set[str] = frozenset()):
+        self.name = name
+        self.domains = domains
+        self.fix_domain = fix_domain
+        self.params = TRACKING_PARAMS | set(params)
+        self.hits = 0
+        self.seconds = 0.0
+
+    def pattern(self) -> str:
+        if self.domains:
+            domains = "|".join(re.escape(domain) for domain in self.domains)
+            host = rf"(?:[\w-]+\.)*(?:{domains})(?![\w.-])"
+        else:
+            host = r"[^\s/?#<>]+"
+        # No capturing groups inside, so the rule's own group is the match's lastgroup
+        return rf"(?P<{self.name}>https?://{host}[^\s<>]*)"
+
+    def _tracking(self, piece: str) -> bool:
+        key = piece.split("=", 1)[0].lower()
+        return key in self.params or key.startswith(TRACKING_PREFIXES)
+
+    def rewrite(self, url: str) -> str:
+        """Return ``url`` with the domain fixed and tracking removed, or ``url`` itself if neither applies."""
+        # Work on the raw text rather than urlsplit/urlunsplit, which normalise links we have no reason to touch
+        rest, hash_, fragment = url.partition("#")
+        rest, question, query = rest.partition("?")
+        scheme, separator, remainder = rest.partition("://")
+        netloc, slash, path = remainder.partition("/")
+        changed = False
+        if self.fix_domain is not None:
+            host = netloc.lower()
+            host = host.removeprefix(next((p for p in MOBILE_PREFIXES if host.startswith(p)), ""))
+            # Other subdomains (pic.twitter.com, vm.tiktok.com) have no equivalent on the fix domain
+            if host in self.domains:
+                scheme, netloc, changed = "https", self.fix_domain, True
+        pieces = query.split("&")
+        kept = [piece for piece in pieces if not self._tracking(piece)]
+        if len(kept) != len(pieces):
+            query = "&".join(piece for piece in kept if piece)
+            question = "?" if query else ""
+            changed = True
+        if not changed:
+            return url
+        return f"{scheme}{separator}{netloc}{slash}{path}{question}{query}{hash_}{fragment}"
+
+DEFAULT_RULES = [
+    Rule("x", ["x.com", "twitter.com"], "fixupx.com", {"s", "t", "ref_src", "ref_url"}),
+    Rule("instagram", ["instagram.com"], "kkinstagram.com", {"igsh", "igshid"}),
+    Rule("tiktok", ["tiktok.com"], "vxtiktok.com", {"_r", "_t", "is_from_webapp", "sender_device", "is_copy_url",
+                                                   "web_id", "share_app_id", "share_link_id"}),
+    Rule("reddit", ["reddit.com"], "rxddit.com", {"rdt", "share_id"}),
+    # Only the share identifiers go; t= and list= etc. are what the link points at
+    Rule("youtube", ["youtube.com", "youtu.be"], params={"si", "feature", "pp"}),
+    Rule("spotify", ["spotify.com"], params={"si", "context"}),
+    # Everything else only has its tracking parameters stripped
+    Rule("tracking", []),
+]
+
+
+class LinkRewriter:
+    """
+    Rewrites links in a message in one pass.
+
+    All rules are compiled into a single alternation, so each message is
+    scanned once no matter how many rules there are, and the named group that
+    matched says which rule applies. Messages without "://" in them, nearly
+    all of them, are rejected with a substring check before the regex runs.
+    """
+
+    def __init__(self, rules: list[Rule] = None):
+        self.rules = {rule.name: rule for rule in (DEFAULT_RULES if rules is None else rules)}
+        self.pattern = re.compile("|".join(rule.pattern() for rule in self.rules.values()), re.IGNORECASE)
+        self.messages = 0
+        self.rejected = 0
+        self.rewritten = 0
+
+    def rewrite(self, content: str) -> str | None:
+        """Return the message with its links rewritten, or None if nothing changed."""
+        self.messages += 1
+        if "://" not in content:
+            self.rejected += 1
+            return None
+        new_content = self.pattern.sub(self._replace, content)
+        if new_content == content:
+            return None
+        self.rewritten += 1
+        return new_content
+
+    def _replace(self, match: re.Match) -> str:
+        start = time.perf_counter()
+        rule = self.rules[match.lastgroup]
+        url = match.group()
+        trailing = ""
+        # Leave a closing bracket or full stop after the link alone, but keep balanced ones like wiki/Foo_(bar)
+        while url and url[-1] in TRAILING_PUNCTUATION and not (url[-1] == ")" and url.count("(") >= url.count(")")):
+            url, trailing = url[:-1], url[-1] + trailing
+        new_url = rule.rewrite(url)
+        if new_url != url:
+            rule.hits += 1
+        rule.seconds += time.perf_counter() - start
+        return new_url + trailing
+
+    def stats(self) -> dict:
+        return {
+            "messages": self.messages,
+            "rejected": self.rejected,
+            "rewritten": self.rewritten,
+            "rules": {name: {"hits": rule.hits, "seconds": rule.seconds} for name, rule in self.rules.items()},
+        }
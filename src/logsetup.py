@@ -0,0 +1,157 @@
+"""
+Shared logging configuration.
+
+Log calls only put the record on a queue; a ``QueueListener`` thread
+formats and writes them, so disk I/O and message formatting stay off the
+event loop. The log file is rotated by size and by age, and rotated files
+are gzipped (also on the writer thread).
+
+Environment:
+    LOG_FILE            path of the log file (logs.log)
+    LOG_LEVEL           root level (DEBUG)
+    LOG_LEVELS          per-logger levels, e.g. "discord=INFO,eb=DEBUG"
+    LOG_MAX_BYTES       rotate when the file reaches this size (10 MiB)
+    LOG_ROTATE_HOURS    rotate when the file is this old (24)
+    LOG_BACKUPS         number of rotated files to keep (7)
+    LOG_SAMPLE_EVERY    keep 1 in N records from sampled loggers (100)
+"""
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+
+import dotenv
+
+dotenv.load_dotenv()
+LOG_FILE = os.getenv("LOG_FILE", "logs.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+# discord.py logs every gateway event at DEBUG, far more than we ever read
+LOG_LEVELS = os.getenv("LOG_LEVELS", "discord=INFO,aiohttp=INFO,asyncio=WARNING")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", 24))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 7))
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", 100))
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that also rotates every ``interval`` seconds and gzips rotated files.
+
+    Rotated files are named logs.log.1.gz, logs.log.2.gz, ... newest first.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval > 0 and time.time() >= self.rollover_at:
+            self.rollover_at = time.time() + self.interval
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats the message here, on the caller's thread. Handing over the
+        # record as is leaves that to the listener; the queue never leaves the process, so args
+        # and exc_info don't need to be made picklable.
+        return record
+
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through only the first of every ``every`` records from each call site.
+
+    Meant for loggers on hot paths, e.g. one debug line per message received.
+    Kept records say how many they stand for.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: dict[tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.pathname, record.lineno)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        if self.every > 1:
+            record.msg = f"{record.msg} [1 in {self.every}]"
+        return True
+
+
+def sampled_logger(name: str, every: int = LOG_SAMPLE_EVERY) -> logging.Logger:
+    """A logger whose records are sampled, 1 in ``every`` per call site."""
+    logger = logging.getLogger(name)
+    if not any(isinstance(f, SampleFilter) for f in logger.filters):
+        logger.addFilter(SampleFilter(every))
+    return logger
+
+
+def _parse_levels(spec: str) -> dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(path: str = LOG_FILE) -> None:
+    """
+    Send all logging through a background writer to a rotating, compressed log file.
+
+    Safe to call more than once; only the first call configures anything.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = CompressingRotatingFileHandler(path, LOG_MAX_BYTES, LOG_ROTATE_HOURS * 3600, LOG_BACKUPS)
+    file_handler.setFormatter(logging.Formatter(FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL.upper())
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
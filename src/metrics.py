@@ -0,0 +1,214 @@
+"""
+In-process metrics: counters, latency histograms and gauges.
+
+Everything is recorded into the module-level ``registry``. ``/stats`` reads
+it directly, and ``start_server`` exposes it in the Prometheus text format
+on a local port.
+"""
+import asyncio
+import bisect
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers everything from a cache hit to a full nmap sweep
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are estimated by interpolating within a bucket."""
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+
+class Registry:
+    def __init__(self):
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.gauges: dict[str, Callable[[], dict[str, float]]] = {}
+
+    @staticmethod
+    def _labels(labels: dict) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        series = self.counters.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = self._labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        return self.histograms.get(name, {}).get(self._labels(labels))
+
+    def gauge(self, prefix: str, read: Callable[[], dict[str, float]]) -> None:
+        """Register a callback whose numeric values are reported as ``<prefix>_<key>`` gauges."""
+        self.gauges[prefix] = read
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the block into histogram ``name``; an exception also counts as ``status="error"``."""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, status=status, **labels)
+
+    def timed(self, name: str, **labels):
+        """Decorator form of ``timer`` for coroutine functions, e.g. task loops."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for prefix, read in sorted(self.gauges.items()):
+            try:
+                values = read()
+            except Exception as e:
+                logger.warning(f"Gauge {prefix} failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+timed = registry.timed
+
+
+def http_trace_config(hosts: set[str] | None = None) -> aiohttp.TraceConfig:
+    """
+    aiohttp tracing that records each request into ``http_request_seconds``.
+
+    Pass it to a ClientSession's ``trace_configs`` to get latency and status
+    per upstream host. If ``hosts`` is given, requests to any host not in it
+    are recorded as "other", so URLs users pass in (/robots) can't add a label
+    each.
+    """
+
+    def host_label(url) -> str:
+        return url.host if hosts is None or url.host in hosts else "other"
+
+    async def on_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_end(session, context, params):
+        observe("http_request_seconds", time.perf_counter() - context.start, host=host_label(params.url),
+                status=params.response.status)
+
+    async def on_exception(session, context, params):
+        observe("http_request_seconds", time.perf_counter() - context.start, host=host_label(params.url),
+                status=type(params.exception).__name__)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_start)
+    trace_config.on_request_end.append(on_end)
+    trace_config.on_request_exception.append(on_exception)
+    return trace_config
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5)
+        # Skip the headers; only the request line matters
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        if request.split(b" ")[1:2] == [b"/metrics"]:
+            body = registry.render().encode()
+            status = "200 OK"
+        else:
+            body = b"Not found\n"
+            status = "404 Not Found"
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(port: int, host: str = "127.0.0.1") -> asyncio.Server:
+    """Serve ``GET /metrics`` in the Prometheus text format. Binds to localhost by default."""
+    server = await asyncio.start_server(_handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
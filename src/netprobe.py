@@ -0,0 +1,237 @@
+"""
+Pure-Python scanning backend with the same interface as ``nmap``.
+
+Hosts are discovered with asyncio TCP connect probes (a refused connection
+still proves the host is up) plus the kernel's ARP table, and ports are
+checked with plain TCP connects against nmap's ``-F`` port list. It needs no
+external binary and no root, at the cost of missing hosts that drop every
+probe and aren't on the local link.
+"""
+import asyncio
+import errno
+import ipaddress
+import socket
+import time
+import weakref
+from contextlib import aclosing
+from pathlib import Path
+from typing import AsyncIterator
+
+from nmap import MAX_WORKERS, Host, Port
+
+ARP_TABLE = Path("/proc/net/arp")
+MAX_SOCKETS = 1000  # keep well under the usual 1024 open files limit
+MAX_DISCOVERY_HOSTS = 65536
+
+# Ports tried during discovery; any answer, even a refusal, means the host is up
+DISCOVERY_PORTS = [80, 443, 22, 445, 139, 3389, 8080, 62078]
+
+# nmap's top 100 TCP ports, i.e. what ``nmap -F`` scans
+FAST_PORTS = [
+    7, 9, 13, 21, 22, 23, 25, 26, 37, 53, 79, 80, 81, 88, 106, 110, 111, 113, 119, 135, 139, 143, 144, 179, 199,
+    389, 427, 443, 444, 445, 465, 513, 514, 515, 543, 544, 548, 554, 587, 631, 646, 873, 990, 993, 995, 1025, 1026,
+    1027, 1028, 1029, 1110, 1433, 1720, 1723, 1755, 1900, 2000, 2001, 2049, 2121, 2717, 3000, 3128, 3306, 3389,
+    3986, 4899, 5000, 5009, 5051, 5060, 5101, 5190, 5357, 5432, 5631, 5666, 5800, 5900, 6000, 6001, 6646, 7070,
+    8000, 8008, 8009, 8080, 8081, 8443, 8888, 9100, 9999, 10000, 32768, 49152, 49153, 49154, 49155, 49156, 49157
+]
+
+# One limit per event loop: the sync wrappers each run their own loop, and a semaphore
+# that ever had to wait is bound to the loop it waited on
+_socket_limits: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def _sockets() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    limit = _socket_limits.get(loop)
+    if limit is None:
+        limit = _socket_limits[loop] = asyncio.Semaphore(MAX_SOCKETS)
+    return limit
+
+
+async def probe(address: str, port: int, timeout: float) -> tuple[str, float | None]:
+    """
+    Try one TCP connection.
+
+    Returns:
+        ("open", rtt), ("closed", rtt) if the connection was refused, or ("filtered", None) on timeout/no route
+    """
+    async with _sockets():
+        start = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), timeout)
+        except ConnectionRefusedError:
+            return "closed", time.monotonic() - start
+        except (asyncio.TimeoutError, OSError) as e:
+            if isinstance(e, OSError) and e.errno == errno.ECONNREFUSED:
+                return "closed", time.monotonic() - start
+            return "filtered", None
+        rtt = time.monotonic() - start
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return "open", rtt
+
+
+def read_arp_table() -> dict[str, str]:
+    """Map IPv4 address to MAC for every complete entry in the kernel ARP table (Linux only)."""
+    try:
+        lines = ARP_TABLE.read_text().splitlines()[1:]
+    except OSError:
+        return {}
+    table = {}
+    for line in lines:
+        fields = line.split()
+        # Flags 0x2 = complete entry; incomplete ones are hosts that didn't answer ARP
+        if len(fields) >= 4 and int(fields[2], 16) & 0x2 and fields[3] != "00:00:00:00:00:00":
+            table[fields[0]] = fields[3].upper()
+    return table
+
+
+def _expand(networks: list[str], exclude: list[str] | None) -> list[str]:
+    skip = set(exclude or [])
+    addresses = []
+    for network in networks:
+        try:
+            net = ipaddress.ip_network(network, strict=False)
+        except ValueError:
+            # A single hostname rather than an address or range
+            addresses.append(network)
+            continue
+        hosts = list(net.hosts()) if net.num_addresses > 2 else list(net)
+        addresses += [str(address) for address in hosts]
+    addresses = [address for address in dict.fromkeys(addresses) if address not in skip]
+    if len(addresses) > MAX_DISCOVERY_HOSTS:
+        raise RuntimeError(f"Refusing to sweep {len(addresses)} addresses (limit {MAX_DISCOVERY_HOSTS})")
+    return addresses
+
+
+async def _discover_one(address: str, timeout: float) -> Host | None:
+    pending = [asyncio.create_task(probe(address, port, timeout)) for port in DISCOVERY_PORTS]
+    try:
+        # The first port that answers at all settles it
+        for next_done in asyncio.as_completed(pending):
+            state, rtt = await next_done
+            if state != "filtered":
+                return Host(address=address, latency=rtt)
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def discover_hosts(networks: list[str], timeout: int = 10, exclude: list[str] | None = None) -> list[Host]:
+    """
+    Discover live hosts with TCP connect probes and the ARP table.
+
+    Args:
+        networks: List of network ranges in CIDR notation (e.g., ["192.168.1.0/24"])
+        timeout: Per-host timeout in seconds
+        exclude: Hosts within the networks to skip
+
+    Returns:
+        List of discovered hosts, with MAC addresses where the ARP table has them
+
+    Raises:
+        RuntimeError: If the ranges are too large to sweep
+    """
+    return asyncio.run(discover_hosts_async(networks, timeout, exclude))
+
+
+async def discover_hosts_async(networks: list[str], timeout: int = 10, exclude: list[str] | None = None) -> list[Host]:
+    """Async version of discover_hosts."""
+    addresses = _expand(networks, exclude)
+    # A live LAN host answers within milliseconds, so don't let silent addresses hold the sweep for the full timeout
+    probe_timeout = min(timeout, 2)
+    results = await asyncio.gather(*(_discover_one(address, probe_timeout) for address in addresses))
+    found = {host.address: host for host in results if host is not None}
+
+    # Probing made the kernel ARP for every address, so local hosts that dropped all our probes show up here
+    wanted = set(addresses)
+    for address, mac in read_arp_table().items():
+        if address in wanted:
+            host = found.setdefault(address, Host(address=address))
+            host.mac = mac
+
+    return [found[address] for address in addresses if address in found]
+
+
+def _service(port: int) -> str | None:
+    try:
+        return socket.getservbyport(port, "tcp")
+    except OSError:
+        return None
+
+
+async def scan_host_async(host: str, timeout: int = 30, ports: list[int] | None = None) -> Host:
+    """
+    Connect scan of a single host.
+
+    ``timeout`` bounds the whole host, like nmap's --host-timeout; each
+    connection attempt gets a few seconds of it.
+
+    Returns:
+        The host with its open ports; ``state`` is "down" if nothing answered
+    """
+    ports = FAST_PORTS if ports is None else ports
+    probe_timeout = min(timeout, 3)
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(probe(host, port, probe_timeout) for port in ports)), timeout
+        )
+    except asyncio.TimeoutError:
+        return Host(address=host, state="down")
+
+    result = Host(address=host, state="down")
+    rtts = []
+    for port, (state, rtt) in zip(ports, results):
+        if state != "filtered":
+            result.state = "up"
+            rtts.append(rtt)
+        if state == "open":
+            result.ports.append(Port(port=port, protocol="tcp", state="open", service=_service(port)))
+    if rtts:
+        result.latency = min(rtts)
+    return result
+
+
+async def scan_ports_async(hosts: list[str], timeout: int = 30, workers: int = MAX_WORKERS) -> AsyncIterator[Host]:
+    """
+    Port scan hosts concurrently, yielding each host's results as soon as it finishes.
+
+    ``workers`` hosts are scanned at once; the sockets across all of them are
+    capped by ``MAX_SOCKETS``. Closing the generator early cancels the rest.
+    """
+    semaphore = asyncio.Semaphore(workers)
+
+    async def scan(host: str) -> Host:
+        async with semaphore:
+            return await scan_host_async(host, timeout)
+
+    tasks = [asyncio.create_task(scan(host)) for host in hosts]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def scan_ports(hosts: list[str], timeout: int = 30, workers: int = MAX_WORKERS) -> dict[str, Host]:
+    """
+    Connect scan the given hosts.
+
+    Returns:
+        Dict mapping each host IP to its scan result
+    """
+
+    async def collect() -> dict[str, Host]:
+        async with aclosing(scan_ports_async(hosts, timeout, workers)) as results:
+            found = {}
+            async for result in results:
+                found[result.address] = result
+        return {host: found.get(host, Host(address=host, state="down")) for host in hosts}
+
+    return asyncio.run(collect())
@@ -1,63 +1,275 @@
+import asyncio
 import subprocess
+import time
+import xml.etree.ElementTree as ET
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Iterator
 
+import metrics
 
-def discover_hosts(networks: list[str], timeout: int = 10) -> list[str]:
+MAX_WORKERS = 8
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(slots=True)
+class Port:
+    port: int
+    protocol: str
+    state: str
+    service: str | None = None
+
+    def __str__(self) -> str:
+        return f"{self.port}/{self.protocol}"
+
+
+@dataclass(slots=True)
+class Host:
+    address: str
+    state: str = "up"
+    mac: str | None = None
+    vendor: str | None = None
+    hostname: str | None = None
+    latency: float | None = None  # smoothed round trip time in seconds
+    ports: list[Port] = field(default_factory=list)
+
+    @property
+    def open_ports(self) -> list[Port]:
+        return [port for port in self.ports if port.state == "open"]
+
+    def __str__(self) -> str:
+        return self.address
+
+
+class HostParser:
+    """
+    Incremental parser for nmap XML output (``-oX -``).
+
+    Feed it bytes as they arrive and it returns each ``<host>`` as a ``Host`` as
+    soon as the element is complete. Finished elements are dropped from the
+    tree straight away, so memory use stays flat however many hosts a scan
+    reports.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root: ET.Element | None = None
+        self._depth = 0
+
+    def feed(self, data: bytes) -> list[Host]:
+        self._parser.feed(data)
+        return self._read_hosts()
+
+    def close(self) -> list[Host]:
+        self._parser.close()
+        return self._read_hosts()
+
+    def _read_hosts(self) -> list[Host]:
+        hosts = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = elem
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+            if self._depth == 1:
+                # A direct child of <nmaprun> is complete: parse it if it's a host, then discard it
+                if elem.tag == "host":
+                    hosts.append(_parse_host(elem))
+                self._root.remove(elem)
+        return hosts
+
+
+def _parse_host(elem: ET.Element) -> Host:
+    status = elem.find("status")
+    host = Host(address="", state=status.get("state", "unknown") if status is not None else "unknown")
+
+    for address in elem.iterfind("address"):
+        if address.get("addrtype") == "mac":
+            host.mac = address.get("addr")
+            host.vendor = address.get("vendor")
+        elif not host.address:
+            host.address = address.get("addr", "")
+
+    hostname = elem.find("hostnames/hostname")
+    if hostname is not None:
+        host.hostname = hostname.get("name")
+
+    times = elem.find("times")
+    if times is not None and times.get("srtt"):
+        host.latency = int(times.get("srtt")) / 1_000_000
+
+    for port in elem.iterfind("ports/port"):
+        state = port.find("state")
+        service = port.find("service")
+        host.ports.append(Port(
+            port=int(port.get("portid")),
+            protocol=port.get("protocol", "tcp"),
+            state=state.get("state", "unknown") if state is not None else "unknown",
+            service=service.get("name") if service is not None else None
+        ))
+    return host
+
+
+def parse_xml(chunks: Iterable[bytes]) -> Iterator[Host]:
+    """Parse nmap XML from an iterable of byte chunks (e.g. an open file), yielding hosts as they complete."""
+    parser = HostParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def _run_nmap(args: list[str]) -> AsyncIterator[Host]:
+    """
+    Run nmap with XML output on stdout and yield hosts as nmap reports them.
+
+    Raises:
+        RuntimeError: If the nmap command fails or its output can't be parsed
+    """
+    start = time.perf_counter()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "nmap", *args, "-oX", "-",
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise RuntimeError("nmap is not installed")
+
+    stderr_task = asyncio.create_task(proc.stderr.read())
+    parser = HostParser()
+    try:
+        while chunk := await proc.stdout.read(READ_CHUNK_SIZE):
+            for host in parser.feed(chunk):
+                yield host
+        await proc.wait()
+        stderr = await stderr_task
+
+        if proc.returncode != 0 and stderr:
+            raise RuntimeError(f"nmap failed: {stderr.decode()}")
+        for host in parser.close():
+            yield host
+    except ET.ParseError as e:
+        raise RuntimeError(f"Could not parse nmap output: {e}")
+    finally:
+        # Runs when the caller stops early or is cancelled, as well as on errors
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        stderr_task.cancel()
+        metrics.observe("nmap_seconds", time.perf_counter() - start, scan="discovery" if "-sn" in args else "ports",
+                        returncode=proc.returncode)
+
+
+def discover_hosts(networks: list[str], timeout: int = 10, exclude: list[str] | None = None) -> list[Host]:
     """
     Perform a ping sweep to discover live hosts on the given networks.
 
     Args:
         networks: List of network ranges in CIDR notation (e.g., ["192.168.1.0/24"])
         timeout: Host timeout in seconds (passed to nmap)
+        exclude: Hosts within the networks to skip
 
     Returns:
-        List of discovered host IPs
+        List of discovered hosts, with MAC address, vendor and latency where nmap reports them
+
+    Raises:
+        RuntimeError: If the nmap command fails
+    """
+    return asyncio.run(discover_hosts_async(networks, timeout, exclude))
+
+
+async def discover_hosts_async(networks: list[str], timeout: int = 10, exclude: list[str] | None = None) -> list[Host]:
+    """
+    Async version of discover_hosts, which doesn't block the event loop while nmap runs.
 
     Raises:
         RuntimeError: If the nmap command fails
     """
-    network_args = " ".join(networks)
-    cmd = f"nmap -n -sn -T5 -PE -PP -PM -PR --host-timeout {timeout}s {network_args} | grep '^Nmap scan' | awk '{{print $5}}'"
+    args = ["-n", "-sn", "-T5", "-PE", "-PP", "-PM", "-PR", "--host-timeout", f"{timeout}s", *networks]
+    if exclude:
+        args += ["--exclude", ",".join(exclude)]
+    async with aclosing(_run_nmap(args)) as hosts:
+        return [host async for host in hosts if host.state == "up"]
 
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
 
-    if result.returncode != 0 and result.stderr:
-        raise RuntimeError(f"nmap failed: {result.stderr}")
+async def scan_host_async(host: str, timeout: int = 30) -> Host:
+    """
+    Fast port scan of a single host.
 
-    if not result.stdout:
-        return []
+    Returns:
+        The host with its ports; ``state`` is "down" if nmap got no answer
 
-    return result.stdout.strip().splitlines()
+    Raises:
+        RuntimeError: If the nmap command fails
+    """
+    args = ["-n", "-F", "-T5", "--host-timeout", f"{timeout}s", host]
+    try:
+        async with aclosing(_run_nmap(args)) as results:
+            async for result in results:
+                return result
+    except RuntimeError as e:
+        raise RuntimeError(f"nmap failed for {host}: {e}")
+    return Host(address=host, state="down")
 
 
-def scan_ports(hosts: list[str], timeout: int = 30) -> dict[str, list[str]]:
+async def scan_ports_async(hosts: list[str], timeout: int = 30, workers: int = MAX_WORKERS) -> AsyncIterator[Host]:
     """
-    Perform a fast port scan on the given hosts.
+    Port scan hosts concurrently, yielding each host's results as soon as it finishes.
+
+    At most ``workers`` nmap processes run at once. Closing the generator early
+    (or cancelling the consumer) kills any scans still running.
 
     Args:
         hosts: List of host IPs to scan
         timeout: Host timeout in seconds (passed to nmap, per host)
+        workers: Maximum number of concurrent nmap processes
 
-    Returns:
-        Dict mapping each host to a list of open ports (e.g., {"192.168.1.1": ["22/tcp", "80/tcp"]})
+    Yields:
+        Host records in completion order; see ``Host.open_ports``
 
     Raises:
         RuntimeError: If the nmap command fails
     """
-    results = {}
+    semaphore = asyncio.Semaphore(workers)
+
+    async def scan(host: str) -> Host:
+        async with semaphore:
+            return await scan_host_async(host, timeout)
+
+    tasks = [asyncio.create_task(scan(host)) for host in hosts]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-    for host in hosts:
-        cmd = f"nmap -n -F -T5 --host-timeout {timeout}s {host}"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
 
-        if result.returncode != 0 and result.stderr:
-            raise RuntimeError(f"nmap failed for {host}: {result.stderr}")
+def scan_ports(hosts: list[str], timeout: int = 30, workers: int = MAX_WORKERS) -> dict[str, Host]:
+    """
+    Perform a fast port scan on the given hosts.
 
-        open_ports = []
-        for line in result.stdout.splitlines():
-            if "/tcp" in line and "open" in line:
-                port = line.split()[0]
-                open_ports.append(port)
+    Args:
+        hosts: List of host IPs to scan
+        timeout: Host timeout in seconds (passed to nmap, per host)
+        workers: Maximum number of concurrent nmap processes
+
+    Returns:
+        Dict mapping each host IP to its scan result (e.g., {"192.168.1.1": Host(..., ports=[22/tcp, 80/tcp])})
+
+    Raises:
+        RuntimeError: If the nmap command fails
+    """
 
-        results[host] = open_ports
+    async def collect() -> dict[str, Host]:
+        async with aclosing(scan_ports_async(hosts, timeout, workers)) as results:
+            found = {}
+            async for result in results:
+                found[result.address] = result
+        # Keep the input order, like the sequential scan did
+        return {host: found.get(host, Host(address=host, state="down")) for host in hosts}
 
-    return results
+    return asyncio.run(collect())
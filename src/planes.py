@@ -1,24 +1,289 @@
-from math import cos
-from math import radians
+import asyncio
+import logging
+import os
+import time
+from math import asin, atan2, ceil, cos, degrees, floor, isfinite, radians, sin, sqrt
 
-import requests
+import aiohttp
+import dotenv
 
+import httpclient
+from cache import AsyncTTLCache
+from httpclient import Policy
 
-def get_nearby_aircraft(lat, lon, radius_km=10):
-    lat_diff = radius_km / 111
-    lon_diff = radius_km / (111 * abs(cos(radians(lat))))
+logger = logging.getLogger(__name__)
 
-    url = "https://opensky-network.org/api/states/all"
-    params = {
-        "lamin": lat - lat_diff,
-        "lamax": lat + lat_diff,
-        "lomin": lon - lon_diff,
-        "lomax": lon + lon_diff
-    }
+dotenv.load_dotenv()
+# OpenSky only updates states every ~10s for anonymous users, so there's no point asking more often
+OPENSKY_CACHE_TTL = float(os.getenv("OPENSKY_CACHE_TTL", 10))
+# How old cached states may be when served because OpenSky is rate limiting us
+OPENSKY_STALE_TTL = float(os.getenv("OPENSKY_STALE_TTL", 120))
+OPENSKY_TIMEOUT = float(os.getenv("OPENSKY_TIMEOUT", 10))
 
-    resp = requests.get(url, params=params)
-    return resp.json().get('states', [])
+OPENSKY_API_URL = os.getenv("OPENSKY_API_URL", "https://opensky-network.org/api")
+STATES_URL = f"{OPENSKY_API_URL}/states/all"
+httpclient.register_host(OPENSKY_API_URL)
+BOX_GRID = 0.05  # degrees; boxes are widened to this grid so nearby queries share a cache entry
+MAX_BACKOFF = 600
+# One quick retry; 429s are handled below, since OpenSky says how long to back off
+OPENSKY_POLICY = Policy(total=OPENSKY_TIMEOUT, retries=1)
 
-# t = get_nearby_aircraft(51.254038, 0.437667)
-# # 51.254038, 0.437667
-# print(t)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+M_TO_FT = 3.28084
+MS_TO_KTS = 1.943844
+MS_TO_FPM = 196.8504
+KM_TO_NM = 0.539957
+
+COMPASS_POINTS = ["N", "NE", "E", "SE", "S", "SW", "W", "NW"]
+
+# Raw state lists keyed by (lamin, lamax, lomin, lomax)
+_cache = AsyncTTLCache(ttl=OPENSKY_CACHE_TTL, max_entries=32)
+_backoff_until = 0.0
+_rate_limited = 0
+
+
+class PlanesError(Exception):
+    """Fetching aircraft states from OpenSky failed"""
+    pass
+
+
+class PlanesRateLimitError(PlanesError):
+    """OpenSky is rate limiting us"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"OpenSky rate limit hit, try again in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class Aircraft:
+    """
+    One OpenSky state vector, plus its distance and bearing from the query point.
+
+    Built from the raw state list OpenSky returns (see the ``states/all``
+    docs for the field order). Slots keep hundreds of these cheap, and named
+    fields replace indexing like ``state[7]``. Heights are metres and speeds
+    m/s, as OpenSky reports them; the ``*_ft``/``*_kts`` properties convert.
+    """
+    __slots__ = ("icao24", "callsign", "origin_country", "last_contact", "longitude", "latitude",
+                 "baro_altitude", "on_ground", "velocity", "true_track", "vertical_rate", "geo_altitude",
+                 "squawk", "distance_km", "bearing")
+
+    def __init__(self, icao24: str, callsign: str | None, origin_country: str | None, last_contact: int | None,
+                 longitude: float | None, latitude: float | None, baro_altitude: float | None, on_ground: bool,
+                 velocity: float | None, true_track: float | None, vertical_rate: float | None,
+                 geo_altitude: float | None, squawk: str | None):
+        self.icao24 = icao24
+        self.callsign = (callsign or "").strip() or None
+        self.origin_country = origin_country
+        self.last_contact = last_contact
+        self.longitude = longitude
+        self.latitude = latitude
+        self.baro_altitude = baro_altitude
+        self.on_ground = on_ground
+        self.velocity = velocity
+        self.true_track = true_track
+        self.vertical_rate = vertical_rate
+        self.geo_altitude = geo_altitude
+        self.squawk = squawk
+        self.distance_km: float | None = None
+        self.bearing: float | None = None
+
+    @classmethod
+    def from_state(cls, state: list) -> "Aircraft":
+        return cls(state[0], state[1], state[2], state[4], state[5], state[6], state[7], bool(state[8]),
+                   state[9], state[10], state[11], state[13], state[14])
+
+    def __repr__(self) -> str:
+        return f"Aircraft({self.icao24!r}, {self.callsign!r}, distance_km={self.distance_km})"
+
+    @property
+    def altitude(self) -> float | None:
+        """Barometric altitude in metres, falling back to GPS altitude."""
+        return self.baro_altitude if self.baro_altitude is not None else self.geo_altitude
+
+    @property
+    def altitude_ft(self) -> int | None:
+        return None if self.altitude is None else round(self.altitude * M_TO_FT)
+
+    @property
+    def speed_kts(self) -> int | None:
+        return None if self.velocity is None else round(self.velocity * MS_TO_KTS)
+
+    @property
+    def vertical_rate_fpm(self) -> int | None:
+        return None if self.vertical_rate is None else round(self.vertical_rate * MS_TO_FPM)
+
+    @property
+    def distance_nm(self) -> float | None:
+        return None if self.distance_km is None else self.distance_km * KM_TO_NM
+
+    @property
+    def compass(self) -> str | None:
+        """Eight-point compass direction of the aircraft from the query point."""
+        return None if self.bearing is None else COMPASS_POINTS[round(self.bearing / 45) % 8]
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    """The (lamin, lamax, lomin, lomax) box enclosing a circle of ``radius_km`` around a point."""
+    lat_diff = radius_km / KM_PER_DEGREE_LAT
+    # Use the edge of the circle nearest the pole, where a degree of longitude is shortest
+    widest = min(89.9, abs(lat) + lat_diff)
+    lon_diff = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos(radians(widest))))
+    return (max(-90.0, lat - lat_diff), min(90.0, lat + lat_diff),
+            max(-180.0, lon - lon_diff), min(180.0, lon + lon_diff))
+
+
+def locate(aircraft: list[Aircraft], lat: float, lon: float) -> None:
+    """
+    Set ``distance_km`` (great-circle) and ``bearing`` (degrees true) from a point on every aircraft.
+
+    The point's trig terms are computed once for the whole batch rather than
+    per aircraft. Aircraft without a position are left at None.
+    """
+    lat1 = radians(lat)
+    lon1 = radians(lon)
+    sin_lat1 = sin(lat1)
+    cos_lat1 = cos(lat1)
+    for ac in aircraft:
+        if ac.latitude is None or ac.longitude is None:
+            ac.distance_km = ac.bearing = None
+            continue
+        lat2 = radians(ac.latitude)
+        dlon = radians(ac.longitude) - lon1
+        sin_lat2 = sin(lat2)
+        cos_lat2 = cos(lat2)
+        # Haversine distance
+        h = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * sin(dlon / 2) ** 2
+        ac.distance_km = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))
+        # Initial bearing
+        y = sin(dlon) * cos_lat2
+        x = cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos(dlon)
+        ac.bearing = (degrees(atan2(y, x)) + 360) % 360
+
+
+def within_radius(aircraft: list[Aircraft], lat: float, lon: float, radius_km: float) -> list[Aircraft]:
+    """Aircraft inside the circle around a point, nearest first."""
+    locate(aircraft, lat, lon)
+    nearby = [ac for ac in aircraft if ac.distance_km is not None and ac.distance_km <= radius_km]
+    nearby.sort(key=lambda ac: ac.distance_km)
+    return nearby
+
+
+def parse_states(states: list[list]) -> list[Aircraft]:
+    return [Aircraft.from_state(state) for state in states]
+
+
+def _snap(box: tuple[float, float, float, float]) -> tuple[float, float, float, float]:
+    """Widen a box outwards to the BOX_GRID."""
+    lamin, lamax, lomin, lomax = box
+    return (round(floor(lamin / BOX_GRID) * BOX_GRID, 4), round(ceil(lamax / BOX_GRID) * BOX_GRID, 4),
+            round(floor(lomin / BOX_GRID) * BOX_GRID, 4), round(ceil(lomax / BOX_GRID) * BOX_GRID, 4))
+
+
+def _covers(outer: tuple, inner: tuple) -> bool:
+    return outer[0] <= inner[0] and outer[1] >= inner[1] and outer[2] <= inner[2] and outer[3] >= inner[3]
+
+
+def _cached_cover(box: tuple, max_age: float | None = None) -> list[list] | None:
+    for key, states in _cache.fresh_items(max_age):
+        if _covers(key, box):
+            return states
+    return None
+
+
+async def fetch_states(box: tuple[float, float, float, float]) -> list[list]:
+    """
+    Download the raw state vectors inside a bounding box.
+
+    Raises:
+        PlanesRateLimitError: OpenSky returned 429, or we are still backing off from one
+        PlanesError: The request failed or returned an error status
+    """
+    global _backoff_until, _rate_limited
+    wait = _backoff_until - time.monotonic()
+    if wait > 0:
+        raise PlanesRateLimitError(wait)
+
+    lamin, lamax, lomin, lomax = box
+    params = {"lamin": lamin, "lamax": lamax, "lomin": lomin, "lomax": lomax}
+    try:
+        logger.debug(f"Requesting OpenSky states for {box}")
+        async with httpclient.get(STATES_URL, params=params, policy=OPENSKY_POLICY) as resp:
+            if resp.status == 429:
+                _rate_limited += 1
+                # OpenSky says how long to wait; otherwise back off exponentially
+                wait = _rate_limit_wait(resp.headers.get("X-Rate-Limit-Retry-After-Seconds"))
+                _backoff_until = time.monotonic() + wait
+                logger.warning(f"OpenSky rate limited us, backing off for {wait:.0f}s")
+                raise PlanesRateLimitError(wait)
+            if resp.status != 200:
+                logger.error(f"OpenSky returned {resp.status}")
+                raise PlanesError(f"OpenSky returned {resp.status}")
+            data = await resp.json(content_type=None)
+    except ValueError as e:
+        logger.error(f"OpenSky returned invalid JSON: {e}")
+        raise PlanesError("OpenSky returned invalid JSON")
+    except asyncio.TimeoutError:
+        logger.error("OpenSky request timed out")
+        raise PlanesError("OpenSky request timed out")
+    except aiohttp.ClientError as e:
+        logger.error(f"OpenSky request exception: {e}")
+        raise PlanesError(f"OpenSky request failed: {e}")
+
+    _rate_limited = 0
+    return data.get("states") or []
+
+
+def _rate_limit_wait(retry_after: str | None) -> float:
+    """Seconds to back off after a 429: OpenSky's header if it's a number, otherwise exponential, at most MAX_BACKOFF."""
+    try:
+        wait = float(retry_after)
+    except (TypeError, ValueError):
+        wait = None
+    if wait is None or not isfinite(wait) or wait < 0:
+        wait = 10 * 2 ** (_rate_limited - 1)
+    return min(MAX_BACKOFF, wait)
+
+
+async def get_states(box: tuple[float, float, float, float]) -> list[list]:
+    """
+    Raw state vectors covering a bounding box, from cache where possible.
+
+    The result may cover more than ``box``: any fresh cached box that
+    contains it is used as is, so smaller queries inside a recent larger one
+    cost nothing. Concurrent requests for the same box share one call. While
+    OpenSky is rate limiting us, states up to OPENSKY_STALE_TTL old are served.
+
+    Raises:
+        PlanesError: Nothing usable is cached and the fetch failed
+    """
+    box = _snap(box)
+    states = _cached_cover(box)
+    if states is not None:
+        _cache.hits += 1
+        return states
+    try:
+        return await _cache.get(box, lambda: fetch_states(box))
+    except PlanesRateLimitError:
+        states = _cached_cover(box, OPENSKY_CACHE_TTL + OPENSKY_STALE_TTL)
+        if states is None:
+            raise
+        logger.info("Serving stale aircraft states while rate limited")
+        return states
+
+
+async def get_nearby_aircraft(lat: float, lon: float, radius_km: float = 10) -> list[Aircraft]:
+    """
+    Aircraft within ``radius_km`` of a point, nearest first.
+
+    OpenSky only filters by bounding box, so the box around the circle is
+    requested and the corners are trimmed off here.
+
+    Raises:
+        PlanesError: The states couldn't be fetched
+    """
+    aircraft = parse_states(await get_states(bounding_box(lat, lon, radius_km)))
+    nearby = within_radius(aircraft, lat, lon, radius_km)
+    logger.debug(f"{len(aircraft)} aircraft in bounding box, {len(nearby)} within {radius_km}km")
+    return nearby
@@ -0,0 +1,40 @@
+import logging
+import os
+import shutil
+from types import ModuleType
+
+import dotenv
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+
+# "auto" uses nmap when it is installed and the pure-Python TCP scanner otherwise
+SCAN_BACKEND = os.getenv("SCAN_BACKEND", "auto")
+
+
+def get_backend(name: str | None = None) -> ModuleType:
+    """
+    Pick the module used for host discovery and port scans.
+
+    Both backends provide ``discover_hosts``/``discover_hosts_async`` and
+    ``scan_ports``/``scan_ports_async`` with the same signatures and
+    ``nmap.Host`` results.
+
+    Args:
+        name: "nmap", "tcp" or "auto"; defaults to the SCAN_BACKEND env var
+
+    Raises:
+        ValueError: If the name is unknown
+    """
+    name = (name or SCAN_BACKEND).lower()
+    if name == "auto":
+        name = "nmap" if shutil.which("nmap") else "tcp"
+        logger.info(f"Using the {name} scan backend")
+    if name == "nmap":
+        import nmap
+        return nmap
+    if name == "tcp":
+        import netprobe
+        return netprobe
+    raise ValueError(f"Unknown scan backend {name!r}, expected nmap, tcp or auto")
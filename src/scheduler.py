@@ -0,0 +1,86 @@
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveInterval:
+    """
+    Chooses the delay before the next poll from how many new items recent polls returned.
+
+    The arrival rate (items per second) is tracked as an exponentially weighted
+    moving average, and the interval is set so that a poll finds roughly
+    ``target_items`` new items, clamped to ``[min_seconds, max_seconds]``. The
+    interval shrinks quickly when items start arriving but only grows by
+    ``growth`` per quiet poll, so a short lull doesn't immediately push polling
+    out to the maximum. Consecutive errors back off exponentially.
+    """
+
+    def __init__(self, min_seconds: float, max_seconds: float, initial: float | None = None,
+                 target_items: float = 2.0, smoothing: float = 0.3, growth: float = 1.5,
+                 jitter: float = 0.1):
+        if not 0 < min_seconds <= max_seconds:
+            raise ValueError("Need 0 < min_seconds <= max_seconds")
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.target_items = target_items
+        self.smoothing = smoothing
+        self.growth = growth
+        self.jitter = jitter
+        self._interval = self._clamp(initial if initial is not None else max_seconds)
+        self._rate = 0.0
+        self._errors = 0
+        self._last_poll: float | None = None
+
+    @property
+    def interval(self) -> float:
+        """The current interval in seconds, before jitter."""
+        return self._interval
+
+    @property
+    def rate(self) -> float:
+        """Estimated new items per second."""
+        return self._rate
+
+    @property
+    def errors(self) -> int:
+        """Number of consecutive failed polls."""
+        return self._errors
+
+    def _clamp(self, seconds: float) -> float:
+        return max(self.min_seconds, min(self.max_seconds, seconds))
+
+    def _elapsed(self) -> float:
+        now = time.monotonic()
+        elapsed = self._interval if self._last_poll is None else now - self._last_poll
+        self._last_poll = now
+        return max(elapsed, 1.0)
+
+    def record(self, new_items: int) -> float:
+        """Record a successful poll and return the updated interval."""
+        observed = new_items / self._elapsed()
+        self._rate += self.smoothing * (observed - self._rate)
+        self._errors = 0
+
+        if self._rate > 0:
+            desired = self.target_items / self._rate
+        else:
+            desired = self.max_seconds
+        # Speed up straight away, slow down gradually
+        self._interval = self._clamp(min(desired, self._interval * self.growth))
+        logger.debug(f"Poll found {new_items} new items, rate={self._rate:.4f}/s, interval={self._interval:.0f}s")
+        return self._interval
+
+    def record_error(self) -> float:
+        """Record a failed poll and return the backed-off interval."""
+        self._last_poll = time.monotonic()
+        self._errors += 1
+        self._interval = self._clamp(self._interval * 2)
+        logger.debug(f"Poll failed ({self._errors} in a row), interval={self._interval:.0f}s")
+        return self._interval
+
+    def next_delay(self) -> float:
+        """The current interval with random jitter applied, for scheduling the next poll."""
+        spread = self._interval * self.jitter
+        return self._clamp(self._interval + random.uniform(-spread, spread))
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    search TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (search, item_id)
+) WITHOUT ROWID
+"""
+
+
+class SeenIndex:
+    """
+    Bounded, persistent set of listing IDs already seen, kept per saved search.
+
+    Membership checks hit an in-memory LRU (one ``OrderedDict`` per search), so
+    deduplicating a result page costs O(1) per item. Each search keeps at most
+    ``max_items`` IDs, and IDs not seen for ``max_age`` seconds are dropped.
+
+    Changes are buffered and written to SQLite by ``commit``/``commit_async`` in
+    a single transaction, so a crash never leaves a half-written index.
+    """
+
+    def __init__(self, path: Path, max_items: int = 5000, max_age: float = 30 * 86400,
+                 touch_interval: float = 3600):
+        self.path = path
+        self.max_items = max_items
+        self.max_age = max_age
+        # Re-seeing an item only refreshes its stored timestamp once per interval, to keep writes small
+        self.touch_interval = touch_interval
+        self._items: dict[str, OrderedDict[str, float]] = {}
+        self._upserts: dict[tuple[str, str], float] = {}
+        self._deletes: set[tuple[str, str]] = set()
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute(SCHEMA)
+        return conn
+
+    def _load(self) -> None:
+        cutoff = time.time() - self.max_age
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT search, item_id, seen_at FROM seen WHERE seen_at >= ? ORDER BY seen_at",
+                    (cutoff,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Failed to load seen index from {self.path}: {e}")
+            return
+
+        for search, item_id, seen_at in rows:
+            self._items.setdefault(search, OrderedDict())[item_id] = seen_at
+        for search, items in self._items.items():
+            while len(items) > self.max_items:
+                items.popitem(last=False)
+        logger.info(f"Loaded {len(rows)} seen items for {len(self._items)} searches from {self.path}")
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._items.values())
+
+    def contains(self, search: str, item_id: str) -> bool:
+        items = self._items.get(search)
+        return items is not None and item_id in items
+
+    def is_empty(self, search: str) -> bool:
+        return not self._items.get(search)
+
+    def add(self, search: str, item_id: str, seen_at: float | None = None) -> None:
+        """Mark an item as seen, or refresh it if it already is."""
+        seen_at = time.time() if seen_at is None else seen_at
+        items = self._items.setdefault(search, OrderedDict())
+
+        previous = items.get(item_id)
+        items[item_id] = seen_at
+        items.move_to_end(item_id)
+        if previous is None or seen_at - previous >= self.touch_interval:
+            self._upserts[(search, item_id)] = seen_at
+            self._deletes.discard((search, item_id))
+        else:
+            # Keep the stored timestamp so the in-memory age matches what a restart would load
+            items[item_id] = previous
+
+        while len(items) > self.max_items:
+            evicted, _ = items.popitem(last=False)
+            self._upserts.pop((search, evicted), None)
+            self._deletes.add((search, evicted))
+
+    def expire(self, now: float | None = None) -> int:
+        """Drop items that have not been seen for ``max_age`` seconds. Returns how many were dropped."""
+        cutoff = (time.time() if now is None else now) - self.max_age
+        dropped = 0
+        for search, items in self._items.items():
+            # Items are kept in last-seen order, so the oldest are always at the front
+            while items:
+                item_id, seen_at = next(iter(items.items()))
+                if seen_at >= cutoff:
+                    break
+                items.popitem(last=False)
+                self._upserts.pop((search, item_id), None)
+                dropped += 1
+        if dropped:
+            logger.debug(f"Expired {dropped} seen items older than {self.max_age}s")
+        return dropped
+
+    def _take_pending(self) -> tuple[list, list, float]:
+        upserts = [(search, item_id, seen_at) for (search, item_id), seen_at in self._upserts.items()]
+        deletes = list(self._deletes)
+        self._upserts = {}
+        self._deletes = set()
+        return upserts, deletes, time.time() - self.max_age
+
+    def _write(self, upserts: list, deletes: list, cutoff: float) -> None:
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO seen (search, item_id, seen_at) VALUES (?, ?, ?)", upserts)
+                conn.executemany("DELETE FROM seen WHERE search = ? AND item_id = ?", deletes)
+                conn.execute("DELETE FROM seen WHERE seen_at < ?", (cutoff,))
+            logger.debug(f"Committed seen index: {len(upserts)} upserts, {len(deletes)} evictions")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to commit seen index to {self.path}: {e}")
+
+    def commit(self) -> None:
+        self.expire()
+        self._write(*self._take_pending())
+
+    async def commit_async(self) -> None:
+        """Like ``commit``, but runs the SQLite write in a worker thread."""
+        self.expire()
+        await asyncio.to_thread(self._write, *self._take_pending())
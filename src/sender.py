@@ -0,0 +1,251 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+logger = logging.getLogger(__name__)
+
+# Discord message limits used when coalescing
+MAX_CONTENT_CHARS = 2000
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+class Priority(IntEnum):
+    """Lower values are sent first."""
+    INTERACTIVE = 0  # replies to slash commands
+    NORMAL = 1  # replies to messages, e.g. link rewrites
+    BACKGROUND = 2  # scheduled posts such as eBay listings and the daily weather
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter whose waiters are served in priority order.
+
+    ``rate`` tokens are added per second up to ``capacity``; each ``acquire``
+    takes one. When the bucket is empty, waiters are woken lowest priority
+    value first, then in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: int = Priority.NORMAL) -> None:
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # We were granted a token but cancelled before using it
+                self._tokens += 1
+                self._schedule()
+            raise
+
+    def _schedule(self) -> None:
+        if self._timer is not None or not self._waiters:
+            return
+        self._refill()
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+        self._schedule()
+
+
+@dataclass(order=True)
+class _Outgoing:
+    priority: int
+    seq: int
+    destination: object = field(compare=False)
+    kwargs: dict = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    coalesce: bool = field(default=True, compare=False)
+
+
+class SendScheduler:
+    """
+    Single outbound path for messages sent by the bot.
+
+    Every destination (channel or interaction followup webhook) has its own
+    queue, drained by one worker that respects a per-destination token bucket
+    plus a bot-wide one, so a burst from one feature can't trigger 429s for the
+    rest. Queued messages go out in priority order. Consecutive queued
+    messages to the same destination with the same priority are coalesced:
+    plain text is joined up to 2000 characters, and embed-only messages are
+    merged up to 10 embeds.
+    """
+
+    def __init__(self, per_destination_rate: float = 1.0, per_destination_burst: float = 5,
+                 global_rate: float = 40.0, global_burst: float = 40):
+        self.per_destination_rate = per_destination_rate
+        self.per_destination_burst = per_destination_burst
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+        self._buckets: dict[tuple, TokenBucket] = {}
+        self._queues: dict[tuple, list[_Outgoing]] = {}
+        self._workers: dict[tuple, asyncio.Task] = {}
+        self._seq = itertools.count()
+
+        self.sent = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @staticmethod
+    def _key(destination) -> tuple:
+        # Followup webhooks are recreated on every access, so key them by their token instead of identity
+        return type(destination).__name__, getattr(destination, "id", None), getattr(destination, "token", None)
+
+    def submit(self, destination, content: str | None = None, *, priority: Priority = Priority.NORMAL,
+               coalesce: bool = True, **kwargs) -> asyncio.Future:
+        """
+        Queue a message and return a future for the sent message.
+
+        Takes the same keyword arguments as ``destination.send``. Callers sending
+        several messages should submit them all before awaiting, so they can be
+        coalesced. Pass ``coalesce=False`` for a message that must go out on its
+        own, e.g. one that will be edited later.
+        """
+        if content is not None:
+            kwargs["content"] = content
+        loop = asyncio.get_running_loop()
+        key = self._key(destination)
+        item = _Outgoing(int(priority), next(self._seq), destination, kwargs, loop.create_future(), time.monotonic(),
+                         coalesce)
+        heapq.heappush(self._queues.setdefault(key, []), item)
+
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._drain(key))
+        return item.future
+
+    async def send(self, destination, content: str | None = None, *, priority: Priority = Priority.NORMAL,
+                   coalesce: bool = True, **kwargs):
+        """Queue a message and wait until it has been sent. Returns what ``destination.send`` returned."""
+        return await self.submit(destination, content, priority=priority, coalesce=coalesce, **kwargs)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "active_destinations": len(self._workers),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "avg_wait": self.total_wait / self.sent if self.sent else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+    async def _drain(self, key: tuple) -> None:
+        queue = self._queues[key]
+        if key not in self._buckets and len(self._buckets) >= 256:
+            self._prune_buckets()
+        bucket = self._buckets.setdefault(key, TokenBucket(self.per_destination_rate, self.per_destination_burst))
+        try:
+            while queue:
+                await bucket.acquire(queue[0].priority)
+                await self._global_bucket.acquire(queue[0].priority)
+
+                # Pop only now, so anything more urgent that arrived while we waited goes first,
+                # then coalesce whatever queued up behind it
+                batch = [heapq.heappop(queue)]
+                kwargs = dict(batch[0].kwargs)
+                while (batch[0].coalesce and queue and queue[0].coalesce
+                       and queue[0].priority == batch[0].priority):
+                    merged = self._merge(kwargs, queue[0].kwargs)
+                    if merged is None:
+                        break
+                    kwargs = merged
+                    batch.append(heapq.heappop(queue))
+
+                await self._deliver(batch, kwargs)
+        finally:
+            del self._workers[key]
+            # Only non-empty if we were cancelled; fail the leftovers rather than leave callers hanging
+            for item in self._queues.pop(key):
+                if not item.future.done():
+                    item.future.cancel()
+
+    def _prune_buckets(self) -> None:
+        """Forget idle destinations whose bucket has refilled, e.g. followups of finished interactions."""
+        for key, bucket in list(self._buckets.items()):
+            bucket._refill()
+            if key not in self._workers and bucket._tokens >= bucket.capacity:
+                del self._buckets[key]
+
+    async def _deliver(self, batch: list[_Outgoing], kwargs: dict) -> None:
+        now = time.monotonic()
+        for item in batch:
+            wait = now - item.enqueued_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        if len(batch) > 1:
+            self.coalesced += len(batch) - 1
+            logger.debug(f"Coalesced {len(batch)} messages into one send")
+
+        try:
+            message = await batch[0].destination.send(**kwargs)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning(f"Send to {batch[0].destination} failed: {e}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self.sent += len(batch)
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(message)
+
+    @staticmethod
+    def _merge(first: dict, second: dict) -> dict | None:
+        """Combine two messages' send kwargs into one, or return None if they can't be merged."""
+        if set(first) == {"content"} and set(second) == {"content"}:
+            content = f"{first['content']}\n{second['content']}"
+            if len(content) <= MAX_CONTENT_CHARS:
+                return {"content": content}
+            return None
+
+        if set(first) <= {"embed", "embeds"} and set(second) <= {"embed", "embeds"} and first and second:
+            embeds = []
+            for kwargs in (first, second):
+                embeds.extend(kwargs.get("embeds") or [])
+                if kwargs.get("embed") is not None:
+                    embeds.append(kwargs["embed"])
+            if (len(embeds) <= MAX_EMBEDS_PER_MESSAGE
+                    and sum(len(embed) for embed in embeds) <= MAX_EMBED_CHARS_PER_MESSAGE):
+                return {"embeds": embeds}
+        return None
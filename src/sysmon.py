@@ -0,0 +1,155 @@
+"""
+Background sampling of system load for /cpu.
+
+A daemon thread reads CPU, memory, load average, disk and network counters
+every ``SYSMON_INTERVAL`` seconds into a fixed-size ring buffer holding
+``SYSMON_HISTORY_MINUTES`` of samples. Readers only look at what is already
+there, so nothing on the event loop waits for a measurement.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+import dotenv
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+SYSMON_INTERVAL = float(os.getenv("SYSMON_INTERVAL", 5))
+SYSMON_HISTORY_MINUTES = float(os.getenv("SYSMON_HISTORY_MINUTES", 15))
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class Sample(NamedTuple):
+    time: float  # Unix time
+    cpu: float  # percent, all cores
+    per_cpu: tuple[float, ...]
+    memory: float  # percent
+    memory_used: int  # bytes
+    load: tuple[float, float, float]
+    disk_read: float  # bytes per second since the previous sample
+    disk_write: float
+    net_sent: float
+    net_recv: float
+
+
+class SystemSampler:
+    """
+    Samples the system from a background thread.
+
+    Counters (disk, network) are stored as rates over the preceding
+    interval. psutil is imported when the thread starts, not at import time.
+    """
+
+    def __init__(self, interval: float = SYSMON_INTERVAL, history_minutes: float = SYSMON_HISTORY_MINUTES):
+        self.interval = interval
+        self.samples: deque[Sample] = deque(maxlen=math.ceil(history_minutes * 60 / interval) + 1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sysmon", daemon=True)
+        self._thread.start()
+        logger.info(f"System sampler started (every {self.interval}s, {self.samples.maxlen} samples kept)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        import psutil
+
+        # The first cpu_percent call only sets the baseline the next one is measured from
+        psutil.cpu_percent(percpu=True)
+        disk, net = psutil.disk_io_counters(), psutil.net_io_counters()
+        last = time.monotonic()
+        while not self._stop.wait(self.interval):
+            try:
+                now = time.monotonic()
+                elapsed = max(now - last, 1e-6)
+                per_cpu = tuple(psutil.cpu_percent(percpu=True))
+                memory = psutil.virtual_memory()
+                new_disk, new_net = psutil.disk_io_counters(), psutil.net_io_counters()
+                sample = Sample(
+                    time=time.time(),
+                    cpu=sum(per_cpu) / len(per_cpu) if per_cpu else 0.0,
+                    per_cpu=per_cpu,
+                    memory=memory.percent,
+                    memory_used=memory.total - memory.available,
+                    load=psutil.getloadavg(),
+                    disk_read=_rate(disk, new_disk, "read_bytes", elapsed),
+                    disk_write=_rate(disk, new_disk, "write_bytes", elapsed),
+                    net_sent=_rate(net, new_net, "bytes_sent", elapsed),
+                    net_recv=_rate(net, new_net, "bytes_recv", elapsed),
+                )
+                disk, net, last = new_disk, new_net, now
+                with self._lock:
+                    self.samples.append(sample)
+            except Exception as e:
+                logger.error(f"System sample failed: {e}", exc_info=True)
+
+    def latest(self) -> Sample | None:
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def window(self, seconds: float) -> list[Sample]:
+        """Samples from the last ``seconds``, oldest first."""
+        cutoff = time.time() - seconds
+        with self._lock:
+            samples = list(self.samples)
+        return [sample for sample in samples if sample.time >= cutoff]
+
+    def summary(self, field: str, seconds: float) -> tuple[float, float, float] | None:
+        """(min, avg, max) of ``field`` over the last ``seconds``, or None without samples."""
+        values = [getattr(sample, field) for sample in self.window(seconds)]
+        if not values:
+            return None
+        return min(values), sum(values) / len(values), max(values)
+
+    def metrics(self) -> dict:
+        sample = self.latest()
+        if sample is None:
+            return {}
+        return {
+            "cpu_percent": sample.cpu,
+            "memory_percent": sample.memory,
+            "load1": sample.load[0],
+            "disk_read_bytes_per_second": sample.disk_read,
+            "disk_write_bytes_per_second": sample.disk_write,
+            "net_sent_bytes_per_second": sample.net_sent,
+            "net_recv_bytes_per_second": sample.net_recv,
+        }
+
+
+def _rate(old, new, field: str, elapsed: float) -> float:
+    # Either may be None, e.g. in containers without block devices
+    if old is None or new is None:
+        return 0.0
+    return max(0, getattr(new, field) - getattr(old, field)) / elapsed
+
+
+def sparkline(values: list[float], width: int = 30, low: float = 0.0, high: float = 100.0) -> str:
+    """Render ``values`` as block characters, averaging them down to at most ``width`` columns."""
+    if not values:
+        return ""
+    if len(values) > width:
+        step = len(values) / width
+        values = [sum(chunk) / len(chunk) for chunk in
+                  (values[int(i * step):int((i + 1) * step)] for i in range(width)) if chunk]
+    span = (high - low) or 1.0
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(top, max(0, round((value - low) / span * top)))] for value in values)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple
+
+import discord
+
+from planes import Aircraft
+
+logger = logging.getLogger(__name__)
+
+
+class TrackPoint(NamedTuple):
+    at: float
+    latitude: float
+    longitude: float
+    altitude: float | None
+
+
+class Track:
+    """
+    Recent history of one aircraft, keyed by its icao24 address.
+
+    Positions are kept in a ring buffer, so a track never holds more than
+    ``max_points`` however long the aircraft stays in the zone.
+    """
+    __slots__ = ("icao24", "aircraft", "points", "first_seen", "last_seen", "low")
+
+    def __init__(self, aircraft: Aircraft, now: float, max_points: int):
+        self.icao24 = aircraft.icao24
+        self.aircraft = aircraft
+        self.points: deque[TrackPoint] = deque(maxlen=max_points)
+        self.first_seen = now
+        self.last_seen = now
+        self.low = False  # below the alert altitude, so it only alerts once per descent
+
+    def add(self, aircraft: Aircraft, now: float) -> None:
+        self.aircraft = aircraft
+        self.last_seen = now
+        if aircraft.latitude is not None and aircraft.longitude is not None:
+            self.points.append(TrackPoint(now, aircraft.latitude, aircraft.longitude, aircraft.altitude))
+
+    @property
+    def climb(self) -> float | None:
+        """Altitude change in metres across the buffered history."""
+        altitudes = [point.altitude for point in self.points if point.altitude is not None]
+        return altitudes[-1] - altitudes[0] if len(altitudes) > 1 else None
+
+
+class Alert(NamedTuple):
+    kind: str  # "entered" or "low"
+    aircraft: Aircraft
+
+
+class TrackerUpdate(NamedTuple):
+    current: list[Track]  # nearest first
+    entered: list[Track]
+    left: list[Track]
+    alerts: list[Alert]
+
+
+class AircraftTracker:
+    """
+    Follows the aircraft inside an area between polls.
+
+    ``update`` takes the aircraft from one poll and works out which entered
+    and left the zone and which dropped below ``low_altitude`` metres. Tracks
+    are forgotten ``forget_after`` seconds after an aircraft was last seen,
+    and at most ``max_tracks`` are kept, so memory stays bounded.
+    """
+
+    def __init__(self, max_points: int = 40, max_tracks: int = 500, forget_after: float = 60.0,
+                 low_altitude: float | None = None, hysteresis: float = 150.0):
+        self.max_points = max_points
+        self.max_tracks = max_tracks
+        self.forget_after = forget_after
+        self.low_altitude = low_altitude
+        self.hysteresis = hysteresis
+        self.tracks: dict[str, Track] = {}
+        self.updated_at: float | None = None
+
+    def update(self, aircraft: list[Aircraft], now: float | None = None) -> TrackerUpdate:
+        now = time.time() if now is None else now
+        entered, alerts = [], []
+        for ac in aircraft:
+            track = self.tracks.get(ac.icao24)
+            if track is None:
+                track = self.tracks[ac.icao24] = Track(ac, now, self.max_points)
+                entered.append(track)
+                # The first poll only establishes what's already there
+                if self.updated_at is not None:
+                    alerts.append(Alert("entered", ac))
+            track.add(ac, now)
+
+            if self.low_altitude is not None and not ac.on_ground and ac.altitude is not None:
+                if not track.low and ac.altitude < self.low_altitude:
+                    track.low = True
+                    alerts.append(Alert("low", ac))
+                elif track.low and ac.altitude > self.low_altitude + self.hysteresis:
+                    track.low = False
+
+        left = [track for track in self.tracks.values() if now - track.last_seen > self.forget_after]
+        for track in left:
+            del self.tracks[track.icao24]
+        if len(self.tracks) > self.max_tracks:
+            for track in sorted(self.tracks.values(), key=lambda t: t.last_seen)[:len(self.tracks) - self.max_tracks]:
+                del self.tracks[track.icao24]
+
+        self.updated_at = now
+        current = sorted((track for track in self.tracks.values() if track.last_seen == now),
+                         key=lambda t: t.aircraft.distance_km if t.aircraft.distance_km is not None else float("inf"))
+        return TrackerUpdate(current, entered, left, alerts)
+
+
+class LiveMessage:
+    """
+    A message that is kept up to date by editing it rather than posting new ones.
+
+    Edits are throttled to one per ``min_interval`` seconds; updates arriving
+    in between replace each other and only the latest is applied. Unchanged
+    content isn't re-sent. If the message is deleted a new one is posted.
+    """
+
+    def __init__(self, post: Callable[[str], Awaitable], min_interval: float = 10.0):
+        self._post = post
+        self.min_interval = min_interval
+        self.message = None
+        self._content: str | None = None
+        self._pending: str | None = None
+        self._last_edit = 0.0
+        self._flush_task: asyncio.Task | None = None
+        self.edits = 0
+
+    async def update(self, content: str) -> None:
+        self._pending = content
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        wait = self._last_edit + self.min_interval - time.monotonic()
+        if wait <= 0:
+            await self._flush()
+        else:
+            self._flush_task = asyncio.create_task(self._flush(wait))
+
+    async def _flush(self, delay: float = 0.0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        content, self._pending = self._pending, None
+        if content is None or content == self._content:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            if self.message is not None:
+                try:
+                    await self.message.edit(content=content)
+                    self.edits += 1
+                except discord.NotFound:
+                    logger.info("Live message was deleted, posting a new one")
+                    self.message = None
+            if self.message is None:
+                self.message = await self._post(content)
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to update live message: {e}")
+            return
+        self._content = content
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+
+import aiohttp
+import discord
+import dotenv
+
+import httpclient
+from cache import AsyncTTLCache
+from httpclient import Policy
+
+logger = logging.getLogger(__name__)
+
+dotenv.load_dotenv()
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", 600))
+WEATHER_STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", 3600))
+
+OPENWEATHER_API_URL = os.getenv("OPENWEATHER_API_URL", "http://api.openweathermap.org/data/2.5")
+FORECAST_URL = f"{OPENWEATHER_API_URL}/forecast"
+httpclient.register_host(OPENWEATHER_API_URL)
+LOCATION = "Maidstone,GB"
+OPENWEATHER_POLICY = Policy(total=10, retries=2)
+
+# OpenWeather only updates every few minutes, so one cached forecast serves every /weather in that window
+_cache = AsyncTTLCache(ttl=WEATHER_CACHE_TTL, stale_ttl=WEATHER_STALE_TTL, max_entries=8)
+
+
+class WeatherError(Exception):
+    """Fetching the forecast failed"""
+    pass
+
+
+async def fetch_forecast(location: str = LOCATION) -> dict:
+    """
+    Download the 5-day / 3-hour forecast from OpenWeather.
+
+    Raises:
+        WeatherError: The request failed or returned an error status
+    """
+    logger.info(f"Fetching weather data for {location}")
+    params = {"q": location, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+    try:
+        logger.debug(f"Sending weather API request to {FORECAST_URL} for {location}")
+        async with httpclient.get(FORECAST_URL, params=params, policy=OPENWEATHER_POLICY) as resp:
+            logger.debug(f"Weather API response status code: {resp.status}")
+            if resp.status != 200:
+                logger.error(f"Weather API returned {resp.status}")
+                raise WeatherError(f"Weather API returned {resp.status}")
+            return await resp.json()
+    except asyncio.TimeoutError:
+        logger.error("Weather API request timed out")
+        raise WeatherError("Weather request timed out")
+    except aiohttp.ClientError as e:
+        logger.error(f"Weather API request exception: {e}")
+        raise WeatherError(f"Weather request failed: {e}")
+
+
+def parse_forecast(data: dict) -> dict:
+    forecasts = data['list'][:8]  # next 24h
+    logger.debug(f"Processing {len(forecasts)} forecast entries")
+
+    high = max(f['main']['temp_max'] for f in forecasts)
+    low = min(f['main']['temp_min'] for f in forecasts)
+    current = forecasts[0]['weather'][0]['description'].title()
+    rain_expected = any('rain' in f['weather'][0]['main'].lower() for f in forecasts)
+    logger.debug(f"Weather stats: High={high}°C, Low={low}°C, Current={current}, Rain={rain_expected}")
+
+    # build hourly breakdown (3-hour intervals)
+    hourly_lines = []
+    for f in forecasts[:6]:  # next 18 hours
+        time_str = f['dt_txt'].split(' ')[1][:5]  # "09:00"
+        temp = f['main']['temp']
+        icon = "🌧️" if 'rain' in f['weather'][0]['main'].lower() else "☀️"
+        hourly_lines.append(f"`{time_str}` {icon} {temp:.0f}°C")
+
+    return {
+        "high": high,
+        "low": low,
+        "current": current,
+        "rain_expected": rain_expected,
+        "hourly_lines": hourly_lines
+    }
+
+
+def build_weather_embed(forecast: dict) -> discord.Embed:
+    embed = discord.Embed(
+        title="☀️ Weather for Maidstone",
+        color=0x5dadec
+    )
+    embed.add_field(name="Now", value=forecast["current"], inline=False)
+    embed.add_field(name="High", value=f"{forecast['high']:.0f}°C", inline=True)
+    embed.add_field(name="Low", value=f"{forecast['low']:.0f}°C", inline=True)
+    embed.add_field(name="Forecast", value="\n".join(forecast["hourly_lines"]), inline=False)
+
+    if forecast["rain_expected"]:
+        embed.add_field(name="⚠️", value="Rain expected today", inline=False)
+
+    logger.info("Weather embed created successfully")
+    return embed
+
+
+async def _load_weather(location: str) -> dict:
+    forecast = parse_forecast(await fetch_forecast(location))
+    return {"forecast": forecast, "embed": build_weather_embed(forecast)}
+
+
+async def get_weather(location: str = LOCATION) -> dict:
+    """
+    Return the parsed forecast and its embed, from cache where possible.
+
+    Raises:
+        WeatherError: Nothing usable is cached and the fetch failed
+    """
+    return await _cache.get(location, lambda: _load_weather(location))
+
+
+async def fetch_weather(location: str = LOCATION) -> discord.Embed | None:
+    """Return the weather embed, or None if the forecast couldn't be fetched."""
+    try:
+        return (await get_weather(location))["embed"]
+    except (WeatherError, KeyError, IndexError, ValueError) as e:
+        logger.error(f"Failed to get weather: {e}")
+        return None